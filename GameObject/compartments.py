@@ -0,0 +1,183 @@
+import heapq
+import numpy as np
+from typing import List, Set, Tuple
+from .config import *
+
+
+class CompartmentGraph:
+    """
+    Compartments of the ground grid and the walls between them.
+
+    The tiles not covered by a standing wall are labelled into 8-connected
+    components, the compartments. Every wall touching two or more
+    compartments is an edge between them weighted by its remaining HP, so
+    "can this troop walk to that building" and "which wall should it break"
+    become lookups on a graph of a few nodes instead of a search over the
+    whole enclosed region. When a wall falls its tiles join, and merge, the
+    compartments around it through a union-find, nothing is relabelled.
+    """
+
+    NEIGHBOURS = [
+        (0, 1), (0, -1), (1, 0), (-1, 0),
+        (1, 1), (-1, -1), (-1, 1), (1, -1)
+    ]
+
+    def __init__(self, registry):
+        self.registry = registry
+
+        passable = registry.passable_mask(False)
+        self.initial_labels = self.label(passable)
+        self.initial_count = int(self.initial_labels.max()) + 1
+
+        # Compartment labels around every wall tile
+        reg = registry
+        self.wall_ids = np.nonzero(reg.exists & reg.is_wall)[0]
+        self.initial_adjacent = {}
+        for wallID in self.wall_ids:
+            ys, xs = reg.location(wallID)
+            self.initial_adjacent[int(wallID)] = self.neighbour_labels(self.initial_labels, ys, xs)
+
+        self.reset()
+
+    def reset(self):
+        """ Back to the compartments of the intact base """
+        self.labels = self.initial_labels.copy()
+        self.parent = list(range(self.initial_count))
+        self.adjacent = {wallID: set(labels) for wallID, labels in self.initial_adjacent.items()}
+
+    @staticmethod
+    def label(passable: np.ndarray) -> np.ndarray:
+        """ 8-connected component labels of the passable tiles, -1 elsewhere """
+        h, w = passable.shape
+        big = h * w
+        labels = np.where(passable, np.arange(big).reshape(h, w), big)
+        while True:
+            p = np.pad(labels, 1, constant_values=big)
+            spread = labels.copy()
+            for dy, dx in CompartmentGraph.NEIGHBOURS:
+                np.minimum(spread, p[1 + dy:1 + dy + h, 1 + dx:1 + dx + w], out=spread)
+            spread = np.where(passable, spread, big)
+            if np.array_equal(spread, labels):
+                break
+            labels = spread
+
+        compact = np.full(labels.shape, -1, dtype=int)
+        if passable.any():
+            _, compact[passable] = np.unique(labels[passable], return_inverse=True)
+        return compact
+
+    def neighbour_labels(self, labels: np.ndarray, ys: np.ndarray, xs: np.ndarray) -> Set[int]:
+        h, w = labels.shape
+        found = set()
+        for y, x in zip(ys, xs):
+            for dy, dx in self.NEIGHBOURS:
+                ny, nx = y + dy, x + dx
+                if 0 <= ny < h and 0 <= nx < w and labels[ny, nx] >= 0:
+                    found.add(int(labels[ny, nx]))
+        return found
+
+    def find(self, label: int) -> int:
+        while self.parent[label] != label:
+            self.parent[label] = self.parent[self.parent[label]]
+            label = self.parent[label]
+        return label
+
+    # Updates
+
+    def walls_destroyed(self, wallIDs: np.ndarray):
+        """ Open the tiles of the fallen walls, merging the compartments they separated """
+        reg = self.registry
+        for wallID in wallIDs:
+            wallID = int(wallID)
+            if wallID not in self.adjacent:
+                continue
+            roots = {self.find(label) for label in self.adjacent.pop(wallID)}
+            if roots:
+                root = min(roots)
+                for other in roots:
+                    self.parent[other] = root
+            else:
+                # Walled in on every side, the opened tiles form a compartment of their own
+                root = len(self.parent)
+                self.parent.append(root)
+
+            ys, xs = reg.location(wallID)
+            self.labels[ys, xs] = root
+
+            # Standing walls next to the opened tiles now border this compartment too
+            h, w = self.labels.shape
+            for y, x in zip(ys, xs):
+                for dy, dx in self.NEIGHBOURS:
+                    ny, nx = y + dy, x + dx
+                    if 0 <= ny < h and 0 <= nx < w:
+                        neighbour = int(reg.owner_grid[ny, nx])
+                        if neighbour in self.adjacent:
+                            self.adjacent[neighbour].add(root)
+
+    # Queries
+
+    def compartment(self, tile: Tuple[int, int]) -> int:
+        """ Compartment of a tile, -1 on a standing wall """
+        label = self.labels[tile]
+        return self.find(int(label)) if label >= 0 else -1
+
+    def building_compartments(self, buildingID: int) -> Set[int]:
+        """ Compartments a troop can attack the building from """
+        if buildingID in self.adjacent:
+            return {self.find(label) for label in self.adjacent[buildingID]}
+        ys, xs = self.registry.location(buildingID)
+        return {self.find(int(label)) for label in self.labels[ys, xs] if label >= 0}
+
+    def edges(self) -> List[Tuple[int, int, int]]:
+        """ (compartment, compartment, wall ID) for every standing wall between two compartments """
+        result = []
+        for wallID, labels in self.adjacent.items():
+            roots = sorted({self.find(label) for label in labels})
+            result += [(a, b, wallID) for i, a in enumerate(roots) for b in roots[i + 1:]]
+        return result
+
+    def reachable(self, tile: Tuple[int, int], buildingID: int) -> bool:
+        start = self.compartment(tile)
+        return start == -1 or start in self.building_compartments(buildingID)
+
+    def separating_walls(self, tile: Tuple[int, int]) -> List[int]:
+        """ Walls on the border of the tile's compartment that lead into another compartment """
+        start = self.compartment(tile)
+        return sorted({wallID for a, b, wallID in self.edges() if start in (a, b)})
+
+    def wall_to_break(self, tile: Tuple[int, int], buildingID: int) -> int:
+        """
+        First wall on the route into the building's compartments that needs the least total HP broken,
+        the one nearest the tile when several lead into the same compartment. -1 if there is no route
+        """
+        reg = self.registry
+        start = self.compartment(tile)
+        goals = self.building_compartments(buildingID)
+        if start == -1 or start in goals:
+            return -1
+
+        graph = {}
+        for a, b, wallID in self.edges():
+            graph.setdefault(a, []).append((b, wallID))
+            graph.setdefault(b, []).append((a, wallID))
+
+        def distance(wallID):
+            ys, xs = reg.location(wallID)
+            return np.min((ys - tile[0]) ** 2 + (xs - tile[1]) ** 2)
+
+        # Dijkstra over compartments, remembering the first wall of each route
+        best = {start: (0, 0)}
+        queue = [(0, 0, start, -1)]
+        while queue:
+            cost, near, node, firstWall = heapq.heappop(queue)
+            if node in goals:
+                return firstWall
+            if (cost, near) > best[node]:
+                continue
+            for neighbour, wallID in graph.get(node, []):
+                first = wallID if firstWall == -1 else firstWall
+                key = (cost + int(reg.hp[wallID]), distance(first))
+                if key < best.get(neighbour, (np.inf, np.inf)):
+                    best[neighbour] = key
+                    heapq.heappush(queue, key + (neighbour, first))
+        return -1
@@ -38,6 +38,9 @@ class Deck:
         "deck_id": 14,
     }
 
+    # Rows of the troop space at every town hall level before it was sized to the camp
+    LEGACY_TROOP_ROWS = 135
+
     CAMP_CAPACITY_MAP = {
         # Townhall 1
         1: 20,
@@ -83,6 +86,9 @@ class Deck:
         "SkipMove": 7
     }
 
+    # Bumped on every recruitment change so cached state spaces know when to rebuild
+    version = 0
+
     def __init__(self, townHallLevel: int = 1):
         self.deck = {
             "Barbarian": 0,
@@ -151,6 +157,7 @@ class Deck:
         if self.canRecruitTroop(name):
             self.deck[name] = self.getTroopCount(name) + 1
             self.occupancy += self.getHousingSpace(name)
+            self.version += 1
             return True
         else:
             return False
@@ -159,6 +166,7 @@ class Deck:
         if self.isTroopAvailable(name):
             self.deck[name] = self.getTroopCount(name) - 1
             self.occupancy -= self.getHousingSpace(name)
+            self.version += 1
             return True
         else:
             return False
@@ -167,6 +175,7 @@ class Deck:
         for key in self.deck.keys():
             self.deck[key] = 0
         self.occupancy = 0
+        self.version += 1
 
     def fillRandomly(self):
         self.resetDeck()
@@ -259,8 +268,11 @@ class Deck:
                 targetDomainVector[self.getTroopCategoryIndex(name)] = troopObject.getTargetDomain()
         return targetDomainVector
     
-    def getUnplacedTroopSpace(self) -> np.ndarray:
-        troopSpace = np.ones(shape=(135, len(self.TROOP_MAPPING.keys())), dtype=int) * -1
+    def getUnplacedTroopSpace(self, rows: int = None) -> np.ndarray:
+        # One row per housing unit by default, every troop of the deck gets a row
+        rows = self.capacity if rows is None else rows
+        assert rows >= self.capacity
+        troopSpace = np.ones(shape=(rows, len(self.TROOP_MAPPING.keys())), dtype=int) * -1
         return troopSpace
     
     def getStateSpace(self) -> np.ndarray:
@@ -0,0 +1,89 @@
+import numpy as np
+from .compartments import CompartmentGraph
+from .config import *
+
+
+class BaseFeatures:
+    """
+    Per-tile features of a base derived from its layout.
+
+    The defenses covering each tile on the ground and in the air, their
+    summed damage per second, the distance to the nearest building and the
+    compartment the tile lies in, walls being the borders. They are computed
+    once, with whole-grid kernels, when the warzone is built for a base and
+    restored on reset. Only a destroyed defense changes them during a battle:
+    its coverage and DPS masks are subtracted, everything else stays the
+    layout of the intact base.
+    """
+
+    MAPPING = {
+        "ground_coverage": 0,
+        "air_coverage": 1,
+        "dps": 2,
+        "nearest_building_distance": 3,
+        "compartment": 4,
+    }
+
+    # Channels a destroyed defense changes
+    DYNAMIC_CHANNELS = ["ground_coverage", "air_coverage", "dps"]
+
+    # Scaled distance across the whole grid, for tiles of a base without buildings
+    MAX_DISTANCE = int(np.ceil(np.sqrt(2) * BASE_WIDTH * SCALE_FACTOR))
+
+    def __init__(self, registry):
+        reg = registry
+        defIDs = reg.def_ids
+        ys, xs = np.indices((BASE_WIDTH, BASE_WIDTH))
+
+        # Column of every defense in the masks, by building ID
+        self.column = np.full(reg.n_ids, -1, dtype=int)
+        self.column[defIDs] = np.arange(len(defIDs))
+
+        # Tiles within the range annulus of every defense, measured like troop positions
+        cy = reg.centroid_y[defIDs][:, None, None]
+        cx = reg.centroid_x[defIDs][:, None, None]
+        distance = np.sqrt((ys[None] - cy) ** 2 + (xs[None] - cx) ** 2)
+        minRange = (reg.min_range[defIDs] / SCALE_FACTOR)[:, None, None]
+        maxRange = (reg.max_range[defIDs] / SCALE_FACTOR)[:, None, None]
+        covered = (minRange <= distance) & (distance <= maxRange)
+
+        domain = reg.target_domain[defIDs][:, None, None]
+        self.covers_ground = covered & ((domain == 3) | (domain == 1))
+        self.covers_air = covered & ((domain == 3) | (domain == 2))
+        # Damage per hit over the seconds between hits, both channels share the scale
+        dps = reg.dph[defIDs] / np.maximum(reg.atk_speed[defIDs], 1) * 1e+3 / MILISECONDS_PER_FRAME * SCALE_FACTOR
+        self.dps = covered * dps.astype(int)[:, None, None]
+
+        self.initial_space = np.zeros((BASE_WIDTH, BASE_WIDTH, len(self.MAPPING)), dtype=int)
+        self.initial_space[..., self.MAPPING["ground_coverage"]] = self.covers_ground.sum(axis=0)
+        self.initial_space[..., self.MAPPING["air_coverage"]] = self.covers_air.sum(axis=0)
+        self.initial_space[..., self.MAPPING["dps"]] = self.dps.sum(axis=0)
+        self.initial_space[..., self.MAPPING["nearest_building_distance"]] = self.nearest_building_distance(reg, ys, xs)
+        self.initial_space[..., self.MAPPING["compartment"]] = CompartmentGraph.label(reg.passable_mask(False))
+
+        self.space = self.initial_space.copy()
+
+    @classmethod
+    def nearest_building_distance(cls, registry, ys: np.ndarray, xs: np.ndarray) -> np.ndarray:
+        """ Scaled distance from every tile to the nearest tile of a building, 0 on the buildings """
+        reg = registry
+        buildingIDs = np.nonzero(reg.exists)[0]
+        if len(buildingIDs) == 0:
+            return np.full(ys.shape, cls.MAX_DISTANCE)
+
+        # Footprints are rectangles, the gap along each axis gives the distance to the nearest tile
+        gapY = np.maximum(np.maximum(reg.y0[buildingIDs, None, None] - ys, ys - reg.y1[buildingIDs, None, None]), 0)
+        gapX = np.maximum(np.maximum(reg.x0[buildingIDs, None, None] - xs, xs - reg.x1[buildingIDs, None, None]), 0)
+        return (np.sqrt(gapY ** 2 + gapX ** 2).min(axis=0) * SCALE_FACTOR).astype(int)
+
+    def reset(self):
+        """ Back to the features of the intact base """
+        np.copyto(self.space, self.initial_space)
+
+    def defenses_destroyed(self, destroyedIDs: np.ndarray):
+        """ Take the coverage and DPS of the fallen defenses off their tiles """
+        columns = self.column[destroyedIDs]
+        for column in columns[columns >= 0]:
+            self.space[..., self.MAPPING["ground_coverage"]] -= self.covers_ground[column]
+            self.space[..., self.MAPPING["air_coverage"]] -= self.covers_air[column]
+            self.space[..., self.MAPPING["dps"]] -= self.dps[column]
@@ -0,0 +1,70 @@
+"""
+On-disk store of the ground flow fields of an intact base.
+
+Every episode against a saved base starts from the same layout, so the
+distance field from every tile to every building is computed once and kept
+as `<hash>.npy` in a `<base file>.fields` directory next to the base. The
+hash covers the whole base state space, so editing the layout simply misses
+the old file, and stale files are removed when the new one is written.
+Workers map the file read-only instead of loading it.
+"""
+import hashlib
+import os
+import numpy as np
+from .registry import BuildingRegistry
+from .flow_field import FlowFieldCache
+from .config import *
+
+
+def base_content_hash(baseSpace: np.ndarray) -> str:
+    digest = hashlib.sha1()
+    digest.update(str((baseSpace.shape, baseSpace.dtype.str)).encode())
+    digest.update(np.ascontiguousarray(baseSpace).tobytes())
+    return digest.hexdigest()
+
+
+def field_cache_dir(basePath: str) -> str:
+    """ Directory holding the precomputed fields of the base saved at `basePath` """
+    return os.path.splitext(basePath)[0] + ".fields"
+
+
+def compute_ground_fields(baseSpace: np.ndarray) -> np.ndarray:
+    """ (building IDs, 45, 45) step counts from every tile to every building, inf where walls cut it off """
+    registry = BuildingRegistry(baseSpace)
+    fields = FlowFieldCache(registry)
+    steps = np.full((registry.n_ids, BASE_WIDTH, BASE_WIDTH), np.inf, dtype=np.float32)
+    for buildingID in np.nonzero(registry.exists)[0]:
+        steps[buildingID] = fields.ground_field(buildingID).steps
+    return steps
+
+
+def load_ground_fields(cacheDir: str, baseSpace: np.ndarray) -> np.ndarray:
+    """ Memory-mapped ground fields of the base, computed and stored first if the cache misses """
+    contentHash = base_content_hash(baseSpace)
+    path = os.path.join(cacheDir, contentHash + ".npy")
+    if not os.path.exists(path):
+        os.makedirs(cacheDir, exist_ok=True)
+        steps = compute_ground_fields(baseSpace)
+
+        # Write then rename, so concurrent workers never map a partial file
+        tmpPath = "%s.%d.tmp.npy" % (os.path.join(cacheDir, contentHash), os.getpid())
+        np.save(tmpPath, steps)
+        os.replace(tmpPath, path)
+
+        for name in os.listdir(cacheDir):
+            if name.endswith(".npy") and name != contentHash + ".npy" and ".tmp" not in name:
+                os.remove(os.path.join(cacheDir, name))
+
+    return np.load(path, mmap_mode="r")
+
+
+if __name__ == "__main__":
+    import pickle
+    import sys
+
+    # Precompute the fields of saved bases: python -m GameObject.field_store th1base.pkl ...
+    for basePath in sys.argv[1:]:
+        with open(basePath, "rb") as f:
+            base = pickle.load(f)
+        steps = load_ground_fields(field_cache_dir(basePath), base.getStateSpace())
+        print(basePath, "->", field_cache_dir(basePath), steps.shape)
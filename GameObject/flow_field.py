@@ -0,0 +1,249 @@
+import numpy as np
+from typing import List, Tuple
+from .config import *
+
+
+class FlowField:
+    """
+    Distance field toward one building together with its descent map.
+    `next_y`/`next_x` give, for every tile, the neighbour a troop steps to next
+    """
+
+    def __init__(self, steps: np.ndarray, tie: np.ndarray, blockers: np.ndarray, pristine: bool):
+        # Step count from the footprint, and the sub-step tie break that keeps descents straight
+        self.steps = steps
+        self.tie = tie
+        self.refresh()
+        # Building IDs of the walls the wavefront ran into, their destruction invalidates the field
+        self.blockers = blockers
+        # Computed before any wall fell in the episode, so it survives a reset
+        self.pristine = pristine
+
+    def refresh(self):
+        self.distance = self.steps + self.tie
+        self.next_y, self.next_x = FlowFieldCache.descent(self.distance)
+
+    def reaches(self, tile: Tuple[int, int]) -> bool:
+        return np.isfinite(self.distance[tile])
+
+
+class FlowFieldCache:
+    """
+    Flow fields shared by every troop heading to the same building.
+
+    For each (target building, passability class) a multi-source distance
+    field is expanded from the building footprint with a vectorized 8-way
+    wavefront, the same unit step cost as the A* search. A troop then finds
+    its path by following the descent map of the field from its tile, which
+    costs one lookup per tile. Only standing walls block ground troops, so a
+    ground field is dropped, or repaired in place, when a wall it ran into
+    falls; flying fields are the open Chebyshev distance and never change.
+    """
+
+    NEIGHBOURS = np.array([
+        (0, 1), (0, -1), (1, 0), (-1, 0),
+        (1, 1), (-1, -1), (-1, 1), (1, -1)
+    ])
+
+    def __init__(self, registry):
+        self.registry = registry
+        self.fields = {}
+        self.walls_destroyed = 0
+        # Ground steps of every building on the intact base, from the on-disk store
+        self.initial_steps = None
+
+        ys, xs = np.indices((BASE_WIDTH, BASE_WIDTH))
+        self.ys = ys
+        self.xs = xs
+
+    def reset(self):
+        """ Keep only the fields computed on the intact base """
+        self.fields = {key: field for key, field in self.fields.items() if field.pristine}
+        self.walls_destroyed = 0
+
+    def invalidate(self, destroyedIDs: np.ndarray):
+        """ Drop the fields toward destroyed buildings and the ground fields blocked by destroyed walls """
+        reg = self.registry
+        destroyedIDs = np.asarray(destroyedIDs, dtype=int)
+        if len(destroyedIDs) == 0:
+            return
+
+        walls = destroyedIDs[reg.is_wall[destroyedIDs]]
+        self.walls_destroyed += len(walls)
+        for key in list(self.fields):
+            buildingID, isFlying = key
+            if buildingID in destroyedIDs or (not isFlying and self.fields[key].blockers[walls].any()):
+                del self.fields[key]
+
+    @staticmethod
+    def dilate(mask: np.ndarray) -> np.ndarray:
+        """ 8-connected dilation by one tile """
+        p = np.pad(mask, 1)
+        h, w = mask.shape
+        grown = mask.copy()
+        for dy, dx in FlowFieldCache.NEIGHBOURS:
+            grown |= p[1 + dy:1 + dy + h, 1 + dx:1 + dx + w]
+        return grown
+
+    @staticmethod
+    def descent(distance: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """ Neighbour with the lowest distance for every tile, the tile itself when none is lower """
+        h, w = distance.shape
+        p = np.pad(distance, 1, constant_values=np.inf)
+        shifted = np.stack([p[1 + dy:1 + dy + h, 1 + dx:1 + dx + w] for dy, dx in FlowFieldCache.NEIGHBOURS])
+        best = np.argmin(shifted, axis=0)
+        lower = np.take_along_axis(shifted, best[None], axis=0)[0] < distance
+
+        ys, xs = np.indices((h, w))
+        next_y = np.where(lower, ys + FlowFieldCache.NEIGHBOURS[best, 0], ys)
+        next_x = np.where(lower, xs + FlowFieldCache.NEIGHBOURS[best, 1], xs)
+        return next_y, next_x
+
+    def tie_break(self, buildingID: int) -> np.ndarray:
+        """ Euclidean distance to the footprint scaled below one step, so descents run straight """
+        reg = self.registry
+        dy = np.clip(self.ys, reg.y0[buildingID], reg.y1[buildingID]) - self.ys
+        dx = np.clip(self.xs, reg.x0[buildingID], reg.x1[buildingID]) - self.xs
+        return np.sqrt(dy ** 2 + dx ** 2) / (2 * BASE_WIDTH)
+
+    def open_field(self, buildingID: int) -> FlowField:
+        """ Chebyshev distance to the footprint, exact when nothing blocks the way """
+        reg = self.registry
+        dy = np.maximum(np.maximum(reg.y0[buildingID] - self.ys, self.ys - reg.y1[buildingID]), 0)
+        dx = np.maximum(np.maximum(reg.x0[buildingID] - self.xs, self.xs - reg.x1[buildingID]), 0)
+        steps = np.maximum(dy, dx).astype(float)
+        return FlowField(steps, self.tie_break(buildingID), np.zeros(reg.n_ids, dtype=bool), pristine=True)
+
+    def preload(self, initialSteps: np.ndarray):
+        """ Serve the ground fields of the intact base from precomputed steps instead of expanding them """
+        assert initialSteps.shape == (self.registry.n_ids, BASE_WIDTH, BASE_WIDTH)
+        self.initial_steps = initialSteps
+
+    def ground_field(self, buildingID: int) -> FlowField:
+        """ Wavefront from the footprint over the tiles not covered by a standing wall """
+        reg = self.registry
+        passable = reg.passable_mask(False)
+
+        if self.initial_steps is not None and self.walls_destroyed == 0:
+            steps = np.array(self.initial_steps[buildingID], dtype=float)
+            return FlowField(steps, self.tie_break(buildingID), self.blockers(np.isfinite(steps), passable), pristine=True)
+
+        sources = np.zeros((BASE_WIDTH, BASE_WIDTH), dtype=bool)
+        sources[reg.location(buildingID)] = True
+        steps = np.full((BASE_WIDTH, BASE_WIDTH), np.inf)
+        steps[sources] = 0
+
+        reached = sources.copy()
+        frontier = sources
+        step = 0
+        while frontier.any():
+            step += 1
+            frontier = self.dilate(frontier) & passable & ~reached
+            reached |= frontier
+            steps[frontier] = step
+
+        return FlowField(steps, self.tie_break(buildingID), self.blockers(reached, passable), pristine=self.walls_destroyed == 0)
+
+    def blockers(self, reached: np.ndarray, passable: np.ndarray) -> np.ndarray:
+        """ Mask over building IDs of the walls bordering the reached tiles """
+        blockers = np.zeros(self.registry.n_ids, dtype=bool)
+        blockers[self.registry.owner_grid[self.dilate(reached) & ~passable]] = True
+        return blockers
+
+    def repair_field(self, field: FlowField, opened: np.ndarray, passable: np.ndarray) -> np.ndarray:
+        """
+        Lower the steps of a ground field after the `opened` tiles became passable.
+        Steps can only decrease, so the update spreads out from the opened tiles and stops
+        where nothing improves, like the decrease pass of LPA*. Returns the improved tiles
+        """
+        steps = field.steps
+        improved = np.zeros(steps.shape, dtype=bool)
+        h, w = steps.shape
+        candidates = opened & passable
+        while candidates.any():
+            p = np.pad(steps, 1, constant_values=np.inf)
+            best = np.min([p[1 + dy:1 + dy + h, 1 + dx:1 + dx + w] for dy, dx in self.NEIGHBOURS], axis=0)
+            lowered = candidates & (best + 1 < steps)
+            steps[lowered] = best[lowered] + 1
+            improved |= lowered
+            candidates = self.dilate(lowered) & passable
+
+        field.blockers = self.blockers(np.isfinite(steps), passable)
+        field.pristine = False
+        field.refresh()
+        return improved
+
+    def repair(self, destroyedIDs: np.ndarray) -> dict:
+        """
+        Incremental counterpart of `invalidate`: fields toward destroyed buildings are dropped,
+        ground fields blocked by destroyed walls are repaired in place.
+        Returns the improved tiles of every repaired field by key
+        """
+        reg = self.registry
+        destroyedIDs = np.asarray(destroyedIDs, dtype=int)
+        walls = destroyedIDs[reg.is_wall[destroyedIDs]]
+        self.walls_destroyed += len(walls)
+
+        opened = np.zeros((BASE_WIDTH, BASE_WIDTH), dtype=bool)
+        opened[reg.tile_ys[np.isin(reg.tile_owner, walls)], reg.tile_xs[np.isin(reg.tile_owner, walls)]] = True
+        passable = reg.passable_mask(False)
+
+        improved = {}
+        for key in list(self.fields):
+            buildingID, isFlying = key
+            field = self.fields[key]
+            if buildingID in destroyedIDs:
+                del self.fields[key]
+            elif not isFlying and field.blockers[walls].any():
+                improved[key] = self.repair_field(field, opened, passable)
+        return improved
+
+    def get(self, buildingID: int, isFlying: bool) -> FlowField:
+        key = (int(buildingID), bool(isFlying))
+        field = self.fields.get(key)
+        if field is None:
+            field = self.open_field(buildingID) if isFlying else self.ground_field(buildingID)
+            self.fields[key] = field
+        return field
+
+    def in_range(self, buildingID: int, tile: Tuple[int, int], troopRange: float) -> bool:
+        """ Same goal test as the A* search, against the nearest tile of the footprint """
+        reg = self.registry
+        ny = min(max(tile[0], reg.y0[buildingID]), reg.y1[buildingID])
+        nx = min(max(tile[1], reg.x0[buildingID]), reg.x1[buildingID])
+        return np.sqrt((ny - tile[0]) ** 2 + (nx - tile[1]) ** 2) <= troopRange
+
+    def follow(self, buildingID: int, start: Tuple[int, int], troopRange: float, isFlying: bool) -> Tuple[List[Tuple[int, int]], int]:
+        """
+        Descend toward the building from `start` until it is in range.
+        Returns the tiles stepped on and, if a standing wall was in the way, its building ID (-1 otherwise)
+        """
+        out = np.empty((BASE_WIDTH * BASE_WIDTH, 2), dtype=np.int16)
+        n, barrierID = self.follow_into(out, buildingID, start, troopRange, isFlying)
+        return [tuple(tile) for tile in out[:n].tolist()], barrierID
+
+    def follow_into(self, out: np.ndarray, buildingID: int, start: Tuple[int, int], troopRange: float, isFlying: bool) -> Tuple[int, int]:
+        """ Same as `follow`, writing the tiles into the rows of `out` and returning their count """
+        reg = self.registry
+        field = self.get(buildingID, isFlying)
+        blocked = False
+        if not field.reaches(start):
+            # Walled off: head straight for it and stop at the first wall, like the A* barrier fallback
+            field = self.get(buildingID, True)
+            blocked = True
+
+        passable = reg.passable_mask(isFlying)
+        n = 0
+        tile = start
+        for _ in range(len(out)):
+            if self.in_range(buildingID, tile, troopRange):
+                break
+            nextTile = (int(field.next_y[tile]), int(field.next_x[tile]))
+            if nextTile == tile:
+                break
+            if blocked and not passable[nextTile]:
+                return n, int(reg.owner_grid[nextTile])
+            out[n] = nextTile
+            n += 1
+            tile = nextTile
+        return n, -1
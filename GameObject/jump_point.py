@@ -0,0 +1,204 @@
+import heapq
+import numpy as np
+from typing import List, Optional, Tuple
+from .config import *
+
+
+class JumpPointSearch:
+    """
+    Jump Point Search on the 8-connected grid of a passable mask.
+
+    Straight and diagonal runs over open tiles are scanned without pushing
+    anything on the open list; only tiles with a forced neighbour, or inside
+    the goal range, become jump points. Diagonal moves may cut corners, as in
+    the A* search of the warzone. Steps cost 1 and sqrt(2), the costs the
+    symmetry pruning of JPS is exact for.
+
+    Scans that run into a blocked tile record it as a barrier candidate, so an
+    unreachable goal falls back to the closest barrier like the A* search.
+    """
+
+    SQRT2 = np.sqrt(2)
+
+    def __init__(self, passable: np.ndarray, goal: Tuple[int, int], troopRange: float):
+        self.height, self.width = passable.shape
+        # Padded by one blocked tile and held as lists, scans stop at the border without bound checks
+        self.grid = np.pad(passable, 1).tolist()
+        self.goal = goal
+        self.range_sq = troopRange ** 2
+        self.expanded = 0
+
+        # Barrier candidate with the lowest f so far, and the waypoints leading to it from its scan origin
+        self.barrier = None
+        self.barrier_f = float("inf")
+        self.barrier_approach = None
+
+        # Scan origin of the jump being run
+        self.origin = None
+        self.origin_g = 0.0
+
+    @classmethod
+    def octile(cls, a: Tuple[int, int], b: Tuple[int, int]) -> float:
+        dy = abs(a[0] - b[0])
+        dx = abs(a[1] - b[1])
+        return max(dy, dx) + (cls.SQRT2 - 1) * min(dy, dx)
+
+    def walkable(self, y: int, x: int) -> bool:
+        return self.grid[y + 1][x + 1]
+
+    def is_goal(self, y: int, x: int) -> bool:
+        return (y - self.goal[0]) ** 2 + (x - self.goal[1]) ** 2 <= self.range_sq
+
+    def note_barrier(self, tile: Tuple[int, int], approach: List[Tuple[int, int]]):
+        """ Keep the blocked tile closest to the goal, `approach` are the waypoints from the scan origin to it """
+        if not (0 <= tile[0] < self.height and 0 <= tile[1] < self.width):
+            return
+        g = self.origin_g
+        previous = self.origin
+        for waypoint in approach:
+            g += self.octile(previous, waypoint)
+            previous = waypoint
+        f = g + self.octile(previous, tile) + self.octile(tile, self.goal)
+        if f < self.barrier_f:
+            self.barrier_f = f
+            self.barrier = tile
+            self.barrier_approach = (self.origin, approach)
+
+    def jump_straight(self, y: int, x: int, dy: int, dx: int, corner: Optional[Tuple[int, int]] = None) -> Optional[Tuple[int, int]]:
+        """ Scan from (y, x) along a row or column, returning the first jump point """
+        while True:
+            ny, nx = y + dy, x + dx
+            if not self.walkable(ny, nx):
+                approach = [corner, (y, x)] if corner is not None else [(y, x)]
+                self.note_barrier((ny, nx), approach)
+                return None
+            y, x = ny, nx
+            if self.is_goal(y, x):
+                return y, x
+            if dx != 0:
+                if (self.walkable(y + 1, x + dx) and not self.walkable(y + 1, x)) or \
+                        (self.walkable(y - 1, x + dx) and not self.walkable(y - 1, x)):
+                    return y, x
+            else:
+                if (self.walkable(y + dy, x + 1) and not self.walkable(y, x + 1)) or \
+                        (self.walkable(y + dy, x - 1) and not self.walkable(y, x - 1)):
+                    return y, x
+
+    def jump_diagonal(self, y: int, x: int, dy: int, dx: int) -> Optional[Tuple[int, int]]:
+        """ Scan from (y, x) along a diagonal, also stopping where a straight scan finds a jump point """
+        while True:
+            ny, nx = y + dy, x + dx
+            if not self.walkable(ny, nx):
+                self.note_barrier((ny, nx), [(y, x)])
+                return None
+            y, x = ny, nx
+            if self.is_goal(y, x):
+                return y, x
+            if (self.walkable(y + dy, x - dx) and not self.walkable(y, x - dx)) or \
+                    (self.walkable(y - dy, x + dx) and not self.walkable(y - dy, x)):
+                return y, x
+            if self.jump_straight(y, x, dy, 0, corner=(y, x)) is not None or \
+                    self.jump_straight(y, x, 0, dx, corner=(y, x)) is not None:
+                return y, x
+
+    def directions(self, node: Tuple[int, int], parent: Optional[Tuple[int, int]]) -> List[Tuple[int, int]]:
+        """ Pruned scan directions out of a jump point, every direction for the start """
+        if parent is None:
+            return [(dy, dx) for dy in (-1, 0, 1) for dx in (-1, 0, 1) if dy or dx]
+
+        y, x = node
+        dy = int(np.sign(y - parent[0]))
+        dx = int(np.sign(x - parent[1]))
+        if dy and dx:
+            dirs = [(dy, 0), (0, dx), (dy, dx)]
+            if not self.walkable(y, x - dx):
+                dirs.append((dy, -dx))
+            if not self.walkable(y - dy, x):
+                dirs.append((-dy, dx))
+        elif dx:
+            dirs = [(0, dx)]
+            if not self.walkable(y + 1, x):
+                dirs.append((1, dx))
+            if not self.walkable(y - 1, x):
+                dirs.append((-1, dx))
+        else:
+            dirs = [(dy, 0)]
+            if not self.walkable(y, x + 1):
+                dirs.append((dy, 1))
+            if not self.walkable(y, x - 1):
+                dirs.append((dy, -1))
+        return dirs
+
+    @staticmethod
+    def expand(waypoints: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+        """ Tiles stepped on along straight and diagonal segments between waypoints, the first one excluded """
+        tiles = []
+        for (y, x), (ty, tx) in zip(waypoints, waypoints[1:]):
+            dy, dx = int(np.sign(ty - y)), int(np.sign(tx - x))
+            while (y, x) != (ty, tx):
+                y, x = y + dy, x + dx
+                tiles.append((y, x))
+        return tiles
+
+    def search(self, start: Tuple[int, int]) -> Tuple[Optional[List[Tuple[int, int]]], Optional[Tuple[int, int]]]:
+        """
+        Returns the tiles from `start` (excluded) to a tile within range of the goal and no barrier,
+        or the tiles to the closest barrier and the barrier itself, or (None, None)
+        """
+        steps = self.search_steps(start)
+        while True:
+            try:
+                next(steps)
+            except StopIteration as result:
+                waypoints, barrier = result.value
+                return (None, None) if waypoints is None else (self.expand(waypoints), barrier)
+
+    def search_steps(self, start: Tuple[int, int]):
+        """
+        Resumable `search`, yields after every expanded node. Returns the waypoints from `start`
+        (included) instead of the tiles, for the caller to expand where it keeps them
+        """
+        open_set = [(self.octile(start, self.goal), start)]
+        g_score = {start: 0.0}
+        came_from = {start: None}
+        closed = set()
+
+        def chain(node):
+            waypoints = []
+            while node is not None:
+                waypoints.append(node)
+                node = came_from[node]
+            return waypoints[::-1]
+
+        while open_set:
+            _, node = heapq.heappop(open_set)
+            if node in closed:
+                continue
+            closed.add(node)
+            self.expanded += 1
+            yield
+
+            if self.is_goal(*node):
+                return chain(node), None
+
+            self.origin = node
+            self.origin_g = g_score[node]
+            for dy, dx in self.directions(node, came_from[node]):
+                if dy and dx:
+                    jumpPoint = self.jump_diagonal(node[0], node[1], dy, dx)
+                else:
+                    jumpPoint = self.jump_straight(node[0], node[1], dy, dx)
+                if jumpPoint is None or jumpPoint in closed:
+                    continue
+
+                cost = g_score[node] + self.octile(node, jumpPoint)
+                if jumpPoint not in g_score or cost < g_score[jumpPoint]:
+                    g_score[jumpPoint] = cost
+                    came_from[jumpPoint] = node
+                    heapq.heappush(open_set, (cost + self.octile(jumpPoint, self.goal), jumpPoint))
+
+        if self.barrier is None:
+            return None, None
+
+        origin, approach = self.barrier_approach
+        return chain(origin) + approach, self.barrier
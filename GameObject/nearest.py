@@ -0,0 +1,88 @@
+import numpy as np
+from .troops import TroopBase, TroopDirectory
+from .config import *
+
+
+class NearestBuildingMaps:
+    """
+    Nearest standing building of every preference class, per tile.
+
+    A troop at a continuous position is matched to the tile its position
+    rounds to. For each tile and building the distance from any position
+    rounding there to the nearest tile of the footprint is bounded from
+    above and below, footprints being rectangles. Where one building's upper
+    bound is below every other building's lower bound it is the nearest for
+    the whole tile and the map stores it; near the boundaries between
+    buildings the map stores AMBIGUOUS and the caller falls back to the
+    exact scan. When a building falls only the tiles it was nearest for, and
+    the ambiguous ones, are recomputed.
+    """
+
+    PREFERENCES = [
+        TroopBase.PREFER_DEFENSE,
+        TroopBase.PREFER_RESOURCE,
+        TroopBase.PREFER_WALL,
+        TroopBase.PREFER_GENERAL,
+    ]
+
+    # No standing building of the class, and no building nearest for the whole tile
+    NONE = -1
+    AMBIGUOUS = -2
+
+    def __init__(self, registry):
+        self.registry = registry
+        ys, xs = np.indices((BASE_WIDTH, BASE_WIDTH))
+        self.ys = ys.ravel()
+        self.xs = xs.ravel()
+
+        reg = registry
+        self.initial_members = {}
+        self.initial_maps = {}
+        for preference in self.PREFERENCES:
+            types = TroopDirectory.mapPreferenceToBuildingType(preference)
+            members = np.nonzero(reg.exists & np.isin(reg.building_type, types) & (reg.hp > 0))[0]
+            self.initial_members[preference] = members
+            self.initial_maps[preference] = self.nearest(members, np.arange(BASE_WIDTH * BASE_WIDTH))
+        self.reset()
+
+    def reset(self):
+        """ Back to the maps of the intact base """
+        self.members = dict(self.initial_members)
+        self.maps = {preference: nearest.copy() for preference, nearest in self.initial_maps.items()}
+
+    def nearest(self, members: np.ndarray, tiles: np.ndarray) -> np.ndarray:
+        """ Building nearest to every position rounding to each of the flat `tiles`, among `members` """
+        if len(members) == 0:
+            return np.full(len(tiles), self.NONE, dtype=int)
+
+        reg = self.registry
+        # Lattice gap from the tile to each footprint along both axes, the position is within half a tile of it
+        gapY = np.maximum(np.maximum(reg.y0[members] - self.ys[tiles, None], self.ys[tiles, None] - reg.y1[members]), 0)
+        gapX = np.maximum(np.maximum(reg.x0[members] - self.xs[tiles, None], self.xs[tiles, None] - reg.x1[members]), 0)
+        upper = (gapY + 0.5) ** 2 + (gapX + 0.5) ** 2
+        lower = np.maximum(gapY - 0.5, 0) ** 2 + np.maximum(gapX - 0.5, 0) ** 2
+
+        rows = np.arange(len(tiles))
+        best = np.argmin(upper, axis=1)
+        lower[rows, best] = np.inf
+        certain = upper[rows, best] < lower.min(axis=1)
+        return np.where(certain, members[best], self.AMBIGUOUS)
+
+    def buildings_destroyed(self, destroyedIDs: np.ndarray):
+        """ Drop the fallen buildings from their classes and recompute the tiles they were nearest for """
+        for preference, members in self.members.items():
+            fallen = np.isin(members, destroyedIDs)
+            if not fallen.any():
+                continue
+            members = members[~fallen]
+            self.members[preference] = members
+
+            nearest = self.maps[preference]
+            stale = np.nonzero(np.isin(nearest, destroyedIDs) | (nearest == self.AMBIGUOUS))[0]
+            nearest[stale] = self.nearest(members, stale)
+
+    def lookup(self, preference: int, y: np.ndarray, x: np.ndarray) -> np.ndarray:
+        """ Nearest building of the class to each unscaled position, NONE or AMBIGUOUS as stored """
+        tileY = np.clip(np.round(y).astype(int), 0, BASE_WIDTH - 1)
+        tileX = np.clip(np.round(x).astype(int), 0, BASE_WIDTH - 1)
+        return self.maps[preference][tileY * BASE_WIDTH + tileX]
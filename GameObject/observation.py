@@ -0,0 +1,295 @@
+import numpy as np
+from .buildings import BaseBuilding, BuildingDirectory, DefenseBuilding, ResourceBuilding
+from .troops import TroopBase, TroopDirectory
+from .warbase import Base
+from .deck import Deck
+from .features import BaseFeatures
+from .troop_raster import TroopRaster
+from .config import *
+
+# Building IDs keep growing while a base is edited, troop and building IDs are bounded by the int16 range
+MAX_ID = int(np.iinfo(np.int16).max)
+
+# Target domain of a unit hitting both air (2) and ground (1)
+DOMAIN_BOTH = 3
+
+
+def building_limits() -> dict:
+    """ Largest level and scaled attributes of any building at any level """
+    limits = dict.fromkeys(["level", "hp", "gold", "elixir", "min_range", "max_range", "dph", "atk_speed"], 0)
+    for buildingClass in BuildingDirectory.BUILDING_MAP.values():
+        # The builder hut has a single level and no attribute table
+        for level in getattr(buildingClass, "ATTR_MAP", {1: None}):
+            building = buildingClass(level)
+            limits["level"] = max(limits["level"], level)
+            limits["hp"] = max(limits["hp"], building.getHp() * SCALE_FACTOR)
+            if isinstance(building, ResourceBuilding):
+                limits["gold"] = max(limits["gold"], building.getGold())
+                limits["elixir"] = max(limits["elixir"], building.getElixir())
+            if isinstance(building, DefenseBuilding):
+                limits["min_range"] = max(limits["min_range"], building.getMinRange() * SCALE_FACTOR)
+                limits["max_range"] = max(limits["max_range"], building.getMaxRange() * SCALE_FACTOR)
+                limits["dph"] = max(limits["dph"], building.getDph() * SCALE_FACTOR)
+                limits["atk_speed"] = max(limits["atk_speed"], building.getAtkSpeed() * SCALE_FACTOR)
+    return {key: int(np.ceil(value)) for key, value in limits.items()}
+
+
+def troop_limits() -> dict:
+    """ Largest scaled attributes of any troop at any level """
+    limits = dict.fromkeys(["hp", "dph", "mov_speed", "atk_speed", "range"], 0)
+    for troopClass in TroopDirectory.TROOP_MAP.values():
+        for level in troopClass.ATTR_MAP:
+            troop = troopClass(level)
+            limits["hp"] = max(limits["hp"], troop.getHP() * SCALE_FACTOR)
+            limits["dph"] = max(limits["dph"], troop.getDph() * SCALE_FACTOR)
+            limits["mov_speed"] = max(limits["mov_speed"], troop.getMovSpeed() * SCALE_FACTOR)
+            limits["atk_speed"] = max(limits["atk_speed"], troop.getAtkSpeed() * SCALE_FACTOR)
+            limits["range"] = max(limits["range"], troop.getAtkRange() * SCALE_FACTOR)
+    return {key: int(np.ceil(value)) for key, value in limits.items()}
+
+
+def defense_limits() -> dict:
+    """ Most defenses a base can hold and the largest DPS they can sum to, over every town hall level """
+    dps = {}
+    for name, buildingClass in BuildingDirectory.BUILDING_MAP.items():
+        if issubclass(buildingClass, DefenseBuilding):
+            dps[name] = max(
+                building.getDph() / building.getAtkSpeed() * 1e+3 / MILISECONDS_PER_FRAME * SCALE_FACTOR
+                for building in map(buildingClass, buildingClass.ATTR_MAP)
+            )
+
+    counts = BuildingDirectory.BUILDING_MAX_COUNT_MAP.values()
+    return {
+        "count": max(sum(maxCount[name] for name in dps) for maxCount in counts),
+        "dps": int(np.ceil(max(sum(maxCount[name] * dps[name] for name in dps) for maxCount in counts))),
+    }
+
+
+def channel_bounds() -> dict:
+    """ (low, high) of every channel of the base, troop and deck spaces, over every town hall level """
+    building = building_limits()
+    troop = troop_limits()
+    defenses = defense_limits()
+    capacity = max(Deck.CAMP_CAPACITY_MAP.values())
+    # One deck row per troop and one for the skip move
+    slots = len(Deck.DECK_NAME_MAPS_ID)
+    # Cooldown counters wrap at the attack speed and start at one frame
+    buildingTimer = max(building["atk_speed"], MILISECONDS_PER_FRAME)
+    troopTimer = max(troop["atk_speed"], MILISECONDS_PER_FRAME)
+
+    return {
+        "base": {
+            "buildingID": (-1, MAX_ID),
+            "building_type": (BaseBuilding.TYPE_EMPTY, BaseBuilding.TYPE_OTHERS),
+            "building_level": (0, building["level"]),
+            "building_remaining_hp": (0, building["hp"]),
+            "gold": (0, building["gold"]),
+            "elixir": (0, building["elixir"]),
+            "building_object_identifier": (0, max(BaseBuilding.ID_MAP.values())),
+            "building_allowed_position": (0, 1),
+            "building_min_atk_range": (0, building["min_range"]),
+            "building_max_atk_range": (0, building["max_range"]),
+            "building_dph": (0, building["dph"]),
+            "building_atk_speed": (0, building["atk_speed"]),
+            "building_target_domain": (0, DOMAIN_BOTH),
+            "target_troop_id": (-1, capacity - 1),
+            "steps_since_last_shoot": (0, buildingTimer),
+        },
+        # Rows of troops not deployed yet hold -1 in every field
+        "troops": {
+            "troopID": (-1, capacity - 1),
+            "pos_y": (-1, BASE_WIDTH * SCALE_FACTOR),
+            "pos_x": (-1, BASE_WIDTH * SCALE_FACTOR),
+            "steps_since_last_move": (-1, troopTimer),
+            "steps_since_last_hit": (-1, troopTimer),
+            "mov_speed": (-1, troop["mov_speed"]),
+            "atk_speed": (-1, troop["atk_speed"]),
+            "is_flying": (-1, 1),
+            "target_domain": (-1, DOMAIN_BOTH),
+            "hp": (-1, troop["hp"]),
+            "dph": (-1, troop["dph"]),
+            "range": (-1, troop["range"]),
+            "target_preference": (-1, TroopBase.PREFER_GENERAL),
+            "target_building": (-1, MAX_ID),
+            "deck_id": (-1, slots - 1),
+        },
+        "deck": {
+            "deckID": (0, slots - 1),
+            "count": (0, capacity),
+            "hp": (0, troop["hp"]),
+            "dph": (0, troop["dph"]),
+            "mov_speed": (0, troop["mov_speed"]),
+            "atk_speed": (0, troop["atk_speed"]),
+            "range": (0, troop["range"]),
+            "is_flying": (0, 1),
+            "target_preference": (0, TroopBase.PREFER_GENERAL),
+            "target_domain": (0, DOMAIN_BOTH),
+        },
+        "features": {
+            "ground_coverage": (0, defenses["count"]),
+            "air_coverage": (0, defenses["count"]),
+            "dps": (0, defenses["dps"]),
+            "nearest_building_distance": (0, BaseFeatures.MAX_DISTANCE),
+            "compartment": (-1, BASE_WIDTH * BASE_WIDTH - 1),
+        },
+        # Every troop of the largest camp on one tile
+        "troop_density": {
+            "ground_count": (0, capacity),
+            "air_count": (0, capacity),
+            "ground_hp": (0, capacity * troop["hp"]),
+            "air_hp": (0, capacity * troop["hp"]),
+        },
+    }
+
+
+# Base channels a battle changes, the others are fixed by the layout of the base
+DYNAMIC_BASE_CHANNELS = ["building_remaining_hp", "gold", "elixir", "target_troop_id", "steps_since_last_shoot"]
+STATIC_BASE_CHANNELS = [name for name in Base.GRID_MAPPING if name not in DYNAMIC_BASE_CHANNELS]
+
+
+class ObservationWriter:
+    """
+    Preallocated observation arrays filled from the state spaces.
+
+    An observation is made of groups, each holding some channels of one state
+    space in their original order: the whole base, troop and deck spaces, or
+    with `split` the base split into `base_static`, the channels fixed for a
+    whole episode, and `base_dynamic`, the ones a battle changes, so the
+    static part is sent once per episode and only the dynamic part every
+    step. The derived base features, when the template has them, are one
+    more group split the same way, and the troop density raster one more
+    dynamic group. Without `compact` every group is one array of the state
+    space dtype, keyed by the group name. With `compact` the simulation's
+    int64 values are split further into one array per dtype, keyed
+    `<group>_<dtype>` (`base_int8`, `troops_int32`, ...): the bounds of a
+    channel span every building and troop level of the directories and its
+    dtype is the narrowest of int8, int16 and int32 holding them, so the
+    declared bounds and dtypes match the values and nothing downstream has to
+    cast or clip them. Leading dimensions (the instances of a batch) are kept.
+
+    Every observed array is allocated twice and each `write` fills the copy
+    the previous write of the array did not return, so an observation handed
+    out stays unchanged while the next one is written: the consumer can keep
+    the last two observations (a transition) without copying them.
+    """
+
+    DTYPES = (np.int8, np.int16, np.int32)
+
+    MAPPINGS = {
+        "base": Base.GRID_MAPPING,
+        "troops": Deck.TROOP_MAPPING,
+        "deck": Deck.DECK_MAPPING,
+        "features": BaseFeatures.MAPPING,
+        "troop_density": TroopRaster.MAPPING,
+    }
+
+    # Group -> (state space, channels) of every observed group
+    FULL_GROUPS = {
+        "base": ("base", list(Base.GRID_MAPPING)),
+        "troops": ("troops", list(Deck.TROOP_MAPPING)),
+        "deck": ("deck", list(Deck.DECK_MAPPING)),
+    }
+    SPLIT_GROUPS = {
+        "base_static": ("base", STATIC_BASE_CHANNELS),
+        "base_dynamic": ("base", DYNAMIC_BASE_CHANNELS),
+        "troops": ("troops", list(Deck.TROOP_MAPPING)),
+        "deck": ("deck", list(Deck.DECK_MAPPING)),
+    }
+    # Derived base channels, observed when the template has them
+    FEATURE_GROUPS = {
+        "features": ("features", list(BaseFeatures.MAPPING)),
+    }
+    SPLIT_FEATURE_GROUPS = {
+        "features_static": ("features", [name for name in BaseFeatures.MAPPING if name not in BaseFeatures.DYNAMIC_CHANNELS]),
+        "features_dynamic": ("features", BaseFeatures.DYNAMIC_CHANNELS),
+    }
+    RASTER_GROUPS = {
+        "troop_density": ("troop_density", list(TroopRaster.MAPPING)),
+    }
+    STATIC_GROUPS = {"base_static", "features_static"}
+
+    def __init__(self, template: dict, batchShape: tuple = (), compact: bool = False, split: bool = False):
+        bounds = channel_bounds()
+        groups = dict(self.SPLIT_GROUPS if split else self.FULL_GROUPS)
+        if "features" in template:
+            groups.update(self.SPLIT_FEATURE_GROUPS if split else self.FEATURE_GROUPS)
+        if "troop_density" in template:
+            groups.update(self.RASTER_GROUPS)
+        # Key -> (space, channels, lows, highs) of every observed array
+        self.layout = {}
+        self.static_keys = []
+        self.dynamic_keys = []
+        for group, (spaceName, names) in groups.items():
+            if compact:
+                arrays = [
+                    (f"{group}_{np.dtype(dtype).name}", dtype, [name for name in names if self.narrowest_dtype(*bounds[spaceName][name]) == dtype])
+                    for dtype in self.DTYPES
+                ]
+            else:
+                arrays = [(group, template[spaceName].dtype, names)]
+
+            for key, dtype, arrayNames in arrays:
+                if not arrayNames:
+                    continue
+                self.layout[key] = (
+                    spaceName,
+                    [self.MAPPINGS[spaceName][name] for name in arrayNames],
+                    np.array([bounds[spaceName][name][0] for name in arrayNames], dtype=dtype),
+                    np.array([bounds[spaceName][name][1] for name in arrayNames], dtype=dtype),
+                )
+                (self.static_keys if group in self.STATIC_GROUPS else self.dynamic_keys).append(key)
+
+        self.buffers = {
+            key: [np.zeros(batchShape + template[spaceName].shape[:-1] + (len(channels),), dtype=lows.dtype) for _ in range(2)]
+            for key, (spaceName, channels, lows, highs) in self.layout.items()
+        }
+        # Copy of every array the last write returned
+        self.parity = dict.fromkeys(self.layout, 1)
+
+    @classmethod
+    def narrowest_dtype(cls, low: int, high: int):
+        for dtype in cls.DTYPES:
+            info = np.iinfo(dtype)
+            if info.min <= low and high <= info.max:
+                return dtype
+        raise ValueError(f"No compact dtype holds [{low}, {high}]")
+
+    def bounds(self, key: str, shape: tuple) -> tuple:
+        """ (low, high) arrays of `shape` for the observed array `key`, channels last """
+        _, _, lows, highs = self.layout[key]
+        return np.broadcast_to(lows, shape).copy(), np.broadcast_to(highs, shape).copy()
+
+    def shape(self, key: str) -> tuple:
+        return self.buffers[key][0].shape
+
+    def next_buffer(self, key: str) -> np.ndarray:
+        """ The copy of `key` not returned last, which becomes the one returned """
+        self.parity[key] ^= 1
+        return self.buffers[key][self.parity[key]]
+
+    def write(self, spaces: dict, keys: list, into: dict = None) -> dict:
+        """ Copy the state spaces into the idle copy of the observed arrays `keys`, or the arrays `into`, and return them """
+        observation = {}
+        for key in keys:
+            spaceName, channels, _, _ = self.layout[key]
+            space = spaces[spaceName]
+            out = self.next_buffer(key) if into is None else into[key]
+            if channels == list(range(space.shape[-1])):
+                np.copyto(out, space, casting="unsafe")
+            else:
+                for i, channel in enumerate(channels):
+                    out[..., i] = space[..., channel]
+            observation[key] = out
+        return observation
+
+    def reassembly_plan(self, source: "ObservationWriter") -> list:
+        """ (key, index, source key, source index) moving every channel of this layout from where `source` holds it """
+        located = {}
+        for sourceKey, (spaceName, channels, _, _) in source.layout.items():
+            for sourceIndex, channel in enumerate(channels):
+                located[spaceName, channel] = (sourceKey, sourceIndex)
+        return [
+            (key, index) + located[spaceName, channel]
+            for key, (spaceName, channels, _, _) in self.layout.items()
+            for index, channel in enumerate(channels)
+        ]
@@ -0,0 +1,96 @@
+import numpy as np
+from typing import Dict, List, Sequence, Tuple
+from .config import *
+
+
+class PathBuffer:
+    """
+    Waypoints of every troop in one preallocated array.
+
+    Row `troopID` of the (max_troops, max_path_len, 2) int16 buffer holds the
+    tiles of the troop's path in walking order; `head` is the index of the
+    next waypoint and `length` the number of tiles written. Consuming a
+    waypoint only moves the head, so the tick engine advances every moving
+    troop with array operations and planning never allocates.
+    """
+
+    # An 8-connected shortest path never visits a tile twice
+    MAX_PATH_LEN = BASE_WIDTH * BASE_WIDTH
+
+    def __init__(self, maxTroops: int, maxPathLen: int = MAX_PATH_LEN):
+        self.buffer = np.zeros((maxTroops, maxPathLen, 2), dtype=np.int16)
+        self.head = np.zeros(maxTroops, dtype=int)
+        self.length = np.zeros(maxTroops, dtype=int)
+
+    def clear_all(self):
+        self.head[:] = 0
+        self.length[:] = 0
+
+    def clear(self, troopID: int):
+        self.head[troopID] = 0
+        self.length[troopID] = 0
+
+    def set(self, troopID: int, tiles: Sequence[Tuple[int, int]]):
+        """ Replace the troop's path with `tiles`, first waypoint first """
+        n = len(tiles)
+        assert n <= self.buffer.shape[1]
+        if n:
+            self.buffer[troopID, :n] = tiles
+        self.head[troopID] = 0
+        self.length[troopID] = n
+
+    def set_written(self, troopID: int, n: int):
+        """ The first `n` waypoints were written into `buffer[troopID]` in place, make them the troop's path """
+        self.head[troopID] = 0
+        self.length[troopID] = n
+
+    def set_chain(self, troopID: int, cameFrom: Dict[Tuple[int, int], Tuple[int, int]], end: Tuple[int, int], start: Tuple[int, int]):
+        """ Replace the troop's path with the parents chain of a search from `start` (excluded) to `end`, written back to front """
+        n = 0
+        current = end
+        while current != start:
+            n += 1
+            current = cameFrom[current]
+        assert n <= self.buffer.shape[1]
+        row = self.buffer[troopID]
+        current = end
+        for i in range(n - 1, -1, -1):
+            row[i] = current
+            current = cameFrom[current]
+        self.head[troopID] = 0
+        self.length[troopID] = n
+
+    def set_segments(self, troopID: int, waypoints: Sequence[Tuple[int, int]]):
+        """ Replace the troop's path with the tiles along the straight and diagonal segments between waypoints, the first one excluded """
+        row = self.buffer[troopID]
+        n = 0
+        for (y, x), (ty, tx) in zip(waypoints, waypoints[1:]):
+            steps = max(abs(ty - y), abs(tx - x))
+            assert n + steps <= self.buffer.shape[1]
+            offsets = np.arange(1, steps + 1)
+            row[n:n + steps, 0] = y + np.sign(ty - y) * offsets
+            row[n:n + steps, 1] = x + np.sign(tx - x) * offsets
+            n += steps
+        self.head[troopID] = 0
+        self.length[troopID] = n
+
+    def tiles(self, troopID: int) -> List[Tuple[int, int]]:
+        """ Remaining waypoints of the troop, next one first """
+        return [tuple(tile) for tile in self.buffer[troopID, self.head[troopID]:self.length[troopID]].tolist()]
+
+    def has_path(self, troopID: int) -> bool:
+        return self.head[troopID] < self.length[troopID]
+
+    # Vectorized over troop IDs
+
+    def pending(self, troopIDs: np.ndarray) -> np.ndarray:
+        return self.head[troopIDs] < self.length[troopIDs]
+
+    def next_waypoints(self, troopIDs: np.ndarray) -> np.ndarray:
+        return self.buffer[troopIDs, self.head[troopIDs]]
+
+    def is_last(self, troopIDs: np.ndarray) -> np.ndarray:
+        return self.head[troopIDs] + 1 == self.length[troopIDs]
+
+    def advance(self, troopIDs: np.ndarray):
+        self.head[troopIDs] += 1
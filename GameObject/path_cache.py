@@ -0,0 +1,49 @@
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+
+class PathCache:
+    """
+    Least recently used cache of planned paths.
+
+    Keys are (start tile, goal building, flying flag, troop range,
+    passability version). The version only moves when a building is
+    destroyed, so troops starting from the same tile toward the same building
+    share one search until the grid actually changes; entries of older
+    versions are never hit again and age out of the cache.
+    """
+
+    def __init__(self, capacity: int = 4096):
+        assert capacity > 0
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[tuple]:
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key: Hashable, entry: tuple):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self.entries),
+        }
@@ -0,0 +1,193 @@
+import numpy as np
+from typing import List, Tuple
+from .warbase import Base
+from .buildings import BaseBuilding
+from .config import *
+
+
+class BuildingRegistry:
+    """
+    Per-building table built once from the base grid.
+
+    Every attribute is an array indexed by building ID, so hits, lookups and
+    destruction checks are O(1) instead of a scan over the 45x45 grid. The
+    dynamic channels of the grid (HP, gold, elixir, target, shoot timer) are
+    only written back by `write_grid` when an observation is emitted.
+    """
+
+    # Dynamic grid channels owned by the registry while a battle runs
+    DYNAMIC_CHANNELS = {
+        "building_remaining_hp": "hp",
+        "gold": "gold",
+        "elixir": "elixir",
+        "target_troop_id": "target_troop",
+        "steps_since_last_shoot": "steps_since_last_shoot",
+    }
+
+    # Grid channel name for every static attribute of the table
+    STATIC_CHANNELS = {
+        "building_type": "building_type",
+        "building_level": "level",
+        "building_object_identifier": "object_identifier",
+        "building_min_atk_range": "min_range",
+        "building_max_atk_range": "max_range",
+        "building_dph": "dph",
+        "building_atk_speed": "atk_speed",
+        "building_target_domain": "target_domain",
+    }
+
+    def __init__(self, baseSpace: np.ndarray):
+        G = Base.GRID_MAPPING
+        idGrid = baseSpace[:, :, G["buildingID"]]
+        ys, xs = np.nonzero(idGrid >= 0)
+        owner = idGrid[ys, xs]
+
+        # One spare slot past the largest ID: empty tiles and troops without a
+        # target index it through -1 and always read neutral values
+        n = int(owner.max()) + 2 if owner.size else 1
+        self.n_ids = n
+        self.owner_grid = np.where(idGrid >= 0, idGrid, n - 1)
+
+        # Tiles sorted by owner so that each building is a contiguous slice
+        order = np.argsort(owner, kind="stable")
+        self.tile_ys = ys[order]
+        self.tile_xs = xs[order]
+        self.tile_owner = owner[order]
+        self.tile_start = np.searchsorted(self.tile_owner, np.arange(n), side="left")
+        self.tile_end = np.searchsorted(self.tile_owner, np.arange(n), side="right")
+
+        self.exists = np.zeros(n, dtype=bool)
+        self.exists[owner] = True
+
+        self.y0 = np.full(n, BASE_WIDTH, dtype=int)
+        self.x0 = np.full(n, BASE_WIDTH, dtype=int)
+        self.y1 = np.zeros(n, dtype=int)
+        self.x1 = np.zeros(n, dtype=int)
+        np.minimum.at(self.y0, owner, ys)
+        np.minimum.at(self.x0, owner, xs)
+        np.maximum.at(self.y1, owner, ys)
+        np.maximum.at(self.x1, owner, xs)
+        self.y0[~self.exists] = 0
+        self.x0[~self.exists] = 0
+
+        count = np.bincount(owner, minlength=n)
+        safe = np.maximum(count, 1)
+        self.centroid_y = (np.bincount(owner, weights=ys, minlength=n) / safe).astype(int)
+        self.centroid_x = (np.bincount(owner, weights=xs, minlength=n) / safe).astype(int)
+
+        # Every channel is constant over a footprint, so the top-left tile is representative
+        def read(channel: str) -> np.ndarray:
+            values = np.zeros(n, dtype=baseSpace.dtype)
+            values[self.exists] = baseSpace[self.y0[self.exists], self.x0[self.exists], G[channel]]
+            return values
+
+        for channel, attr in self.STATIC_CHANNELS.items():
+            setattr(self, attr, read(channel))
+        for channel, attr in self.DYNAMIC_CHANNELS.items():
+            setattr(self, attr, read(channel))
+        self.target_troop[n - 1] = -1
+
+        self.max_hp = self.hp.copy()
+        self.max_gold = self.gold.copy()
+        self.max_elixir = self.elixir.copy()
+        self.initial_target_troop = self.target_troop.copy()
+        self.initial_steps_since_last_shoot = self.steps_since_last_shoot.copy()
+
+        self.is_wall = self.building_type == BaseBuilding.TYPE_WALL
+        self.counted = self.exists & ~self.is_wall
+
+        # Passability version: 0 for the intact base, a fresh number after every destruction
+        self.passability_version = 0
+        self.last_passability_version = 0
+        self.passable_cache = {}
+        self.reset()
+
+        self.def_ids = np.nonzero(self.exists & (self.building_type == BaseBuilding.TYPE_DEFENSE))[0]
+        townhalls = np.nonzero(self.exists & (self.building_type == BaseBuilding.TYPE_TOWNHALL))[0]
+        self.townhall_id = int(townhalls[0]) if len(townhalls) else -1
+
+    def reset(self):
+        """ Restore the dynamic state the table was built with """
+        np.copyto(self.hp, self.max_hp)
+        np.copyto(self.gold, self.max_gold)
+        np.copyto(self.elixir, self.max_elixir)
+        np.copyto(self.target_troop, self.initial_target_troop)
+        np.copyto(self.steps_since_last_shoot, self.initial_steps_since_last_shoot)
+        self.standing_count = int(np.count_nonzero(self.counted & (self.hp > 0)))
+        if self.passability_version != 0:
+            self.passability_version = 0
+            self.passable_cache.clear()
+
+    def bump_passability_version(self):
+        """ Buildings fell, every cached passable mask or path is stale """
+        self.last_passability_version += 1
+        self.passability_version = self.last_passability_version
+        self.passable_cache.clear()
+
+    # Lookups
+
+    def location(self, buildingID: int) -> Tuple[np.ndarray, np.ndarray]:
+        """ Tile coordinates of the building, in the same form as `np.where` """
+        s, e = self.tile_start[buildingID], self.tile_end[buildingID]
+        return self.tile_ys[s:e], self.tile_xs[s:e]
+
+    def get_property(self, buildingID: int, prop: str):
+        if prop == "buildingID":
+            return buildingID
+        if prop in self.DYNAMIC_CHANNELS:
+            return getattr(self, self.DYNAMIC_CHANNELS[prop])[buildingID]
+        assert prop in self.STATIC_CHANNELS
+        return getattr(self, self.STATIC_CHANNELS[prop])[buildingID]
+
+    def undestroyed_ids(self) -> np.ndarray:
+        return np.nonzero(self.counted & (self.hp > 0))[0]
+
+    def standing_tiles(self, buildingTypes: List[int]) -> np.ndarray:
+        """ (y, x) pairs of every tile belonging to a standing building of the given types """
+        owner = self.tile_owner
+        mask = np.isin(self.building_type[owner], buildingTypes) & (self.hp[owner] > 0)
+        return np.stack([self.tile_ys[mask], self.tile_xs[mask]], axis=1)
+
+    def passable_mask(self, isFlying: bool) -> np.ndarray:
+        """
+        Same as `Base.get_passable_mask`, read from the table instead of the grid.
+        Built once per passability version and shared, callers must not write to it
+        """
+        isFlying = bool(isFlying)
+        mask = self.passable_cache.get(isFlying)
+        if mask is None:
+            if isFlying:
+                mask = np.ones(self.owner_grid.shape, dtype=bool)
+            else:
+                standingWall = self.is_wall & (self.hp > 0)
+                mask = ~standingWall[self.owner_grid]
+            mask.flags.writeable = False
+            self.passable_cache[isFlying] = mask
+        return mask
+
+    # Updates
+
+    def apply_damage(self, damage: np.ndarray):
+        """
+        Apply a per-building damage vector at once.
+        Returns the hit IDs, the damage applied to each and the IDs destroyed by it
+        """
+        hitIDs = np.nonzero(damage)[0]
+        hpBefore = self.hp[hitIDs]
+        applied = np.minimum(damage[hitIDs], hpBefore)
+        self.hp[hitIDs] = hpBefore - applied
+        destroyed = hitIDs[(hpBefore > 0) & (self.hp[hitIDs] == 0)]
+        self.standing_count -= int(np.count_nonzero(self.counted[destroyed]))
+        if len(destroyed):
+            self.bump_passability_version()
+        return hitIDs, applied, destroyed
+
+    def loot(self, buildingID: int, gold: float, elixir: float):
+        self.gold[buildingID] = max(self.gold[buildingID] - gold, 0)
+        self.elixir[buildingID] = max(self.elixir[buildingID] - elixir, 0)
+
+    def write_grid(self, baseSpace: np.ndarray):
+        """ Refresh the dynamic channels of the grid from the table """
+        G = Base.GRID_MAPPING
+        for channel, attr in self.DYNAMIC_CHANNELS.items():
+            baseSpace[self.tile_ys, self.tile_xs, G[channel]] = getattr(self, attr)[self.tile_owner]
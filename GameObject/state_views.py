@@ -0,0 +1,83 @@
+import numpy as np
+from .warbase import Base
+from .deck import Deck
+
+
+class StateView:
+    """
+    Named views over the channels of a state space.
+
+    Every channel of the mapping becomes an attribute holding the
+    `space[..., channel]` view, so `troops.hp[troopIDs]` reads and writes the
+    troop space itself with no dict lookup or getter call per field. The
+    `Deck` and `Base` static helpers keep working on the same arrays.
+    """
+
+    MAPPING = {}
+
+    def __init__(self, space: np.ndarray):
+        assert space.shape[-1] == len(self.MAPPING)
+        self.space = space
+        for name, channel in self.MAPPING.items():
+            setattr(self, name, space[..., channel])
+
+
+class TroopView(StateView):
+    """ Columns of a (troops, fields) troop space """
+
+    MAPPING = Deck.TROOP_MAPPING
+
+    troopID: np.ndarray
+    pos_y: np.ndarray
+    pos_x: np.ndarray
+    steps_since_last_move: np.ndarray
+    steps_since_last_hit: np.ndarray
+    mov_speed: np.ndarray
+    atk_speed: np.ndarray
+    is_flying: np.ndarray
+    target_domain: np.ndarray
+    hp: np.ndarray
+    dph: np.ndarray
+    range: np.ndarray
+    target_preference: np.ndarray
+    target_building: np.ndarray
+    deck_id: np.ndarray
+
+
+class DeckView(StateView):
+    """ Columns of a (deck members, fields) deck space """
+
+    MAPPING = Deck.DECK_MAPPING
+
+    deckID: np.ndarray
+    count: np.ndarray
+    hp: np.ndarray
+    dph: np.ndarray
+    mov_speed: np.ndarray
+    atk_speed: np.ndarray
+    range: np.ndarray
+    is_flying: np.ndarray
+    target_preference: np.ndarray
+    target_domain: np.ndarray
+
+
+class BaseView(StateView):
+    """ (45, 45) channel planes of a base space """
+
+    MAPPING = Base.GRID_MAPPING
+
+    buildingID: np.ndarray
+    building_type: np.ndarray
+    building_level: np.ndarray
+    building_remaining_hp: np.ndarray
+    gold: np.ndarray
+    elixir: np.ndarray
+    building_object_identifier: np.ndarray
+    building_allowed_position: np.ndarray
+    building_min_atk_range: np.ndarray
+    building_max_atk_range: np.ndarray
+    building_dph: np.ndarray
+    building_atk_speed: np.ndarray
+    building_target_domain: np.ndarray
+    target_troop_id: np.ndarray
+    steps_since_last_shoot: np.ndarray
@@ -0,0 +1,75 @@
+import numpy as np
+from typing import List
+from .state_views import TroopView
+
+
+class TargetIndex:
+    """
+    Who targets whom, indexed both ways.
+
+    `attackers[buildingID]` holds the troops that have the building as their
+    target and `defenders[troopID]` the defenses locked on the troop. The
+    troop space and the registry stay the source of truth for the targets
+    themselves, the index only tells which entries to look at: a destroyed
+    building releases its attackers and a dead troop its defenders without
+    scanning every troop or every defense. Entries that went stale because a
+    target was rewritten elsewhere are checked against the source and skipped.
+    """
+
+    def __init__(self, troops: TroopView, registry):
+        self.registry = registry
+        self.target = troops.target_building
+        self.attackers = [set() for _ in range(registry.n_ids)]
+        self.defenders = [set() for _ in range(len(troops.space))]
+
+    def reset(self):
+        for troopIDs in self.attackers:
+            troopIDs.clear()
+        for defenseIDs in self.defenders:
+            defenseIDs.clear()
+
+    # Troops targeting buildings
+
+    def assign(self, troopIDs: np.ndarray, buildingIDs: np.ndarray):
+        """ Set the target building of each troop, -1 to make it targetless """
+        for troopID, buildingID in zip(np.atleast_1d(troopIDs).tolist(), np.atleast_1d(buildingIDs).tolist()):
+            previous = int(self.target[troopID])
+            if previous != -1:
+                self.attackers[previous].discard(troopID)
+            if buildingID != -1:
+                self.attackers[buildingID].add(troopID)
+            self.target[troopID] = buildingID
+
+    def forget_all(self):
+        """ Every troop targetless """
+        self.target[:] = -1
+        for troopIDs in self.attackers:
+            troopIDs.clear()
+
+    def release_buildings(self, buildingIDs: np.ndarray) -> np.ndarray:
+        """ Make the troops targeting any of the buildings targetless, returns their IDs """
+        released = []
+        for buildingID in np.atleast_1d(buildingIDs).tolist():
+            released += [troopID for troopID in self.attackers[buildingID] if self.target[troopID] == buildingID]
+            self.attackers[buildingID].clear()
+        released = np.array(sorted(released), dtype=int)
+        self.target[released] = -1
+        return released
+
+    # Defenses targeting troops
+
+    def lock(self, defenseIDs: np.ndarray, troopIDs: np.ndarray, previousIDs: np.ndarray):
+        """ Record the defenses that switched from `previousIDs` to `troopIDs` """
+        for defenseID, troopID, previous in zip(defenseIDs.tolist(), troopIDs.tolist(), previousIDs.tolist()):
+            if previous != -1:
+                self.defenders[previous].discard(defenseID)
+            self.defenders[troopID].add(defenseID)
+
+    def release_troops(self, troopIDs: np.ndarray) -> List[int]:
+        """ Defenses locked on any of the troops, which forget them """
+        target = self.registry.target_troop
+        released = []
+        for troopID in np.atleast_1d(troopIDs).tolist():
+            released += [defenseID for defenseID in self.defenders[troopID] if target[defenseID] == troopID]
+            self.defenders[troopID].clear()
+        return released
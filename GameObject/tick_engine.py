@@ -0,0 +1,247 @@
+import numpy as np
+from .buildings import BaseBuilding
+from .troops import TroopBase
+from .config import *
+
+
+class TickEngine:
+    """
+    Vectorized tick resolution for a Warzone.
+
+    Every alive troop is advanced in the same pass: movement, cooldowns,
+    damage and deaths are computed on whole columns of the troop space
+    instead of one troop at a time. The troop space is kept in column-major
+    order by the Warzone, so each field is a contiguous 1D view.
+    """
+
+    # Adjacent tiles (diagonal included) are always within melee reach
+    MELEE_REACH = 1.415
+
+    def __init__(self, warzone):
+        self.warzone = warzone
+        self.troopSpace = warzone.troopSpace
+
+        troops = warzone.troops
+        self.troop_id       = troops.troopID
+        self.pos_y          = troops.pos_y
+        self.pos_x          = troops.pos_x
+        self.steps_hit      = troops.steps_since_last_hit
+        self.mov_speed      = troops.mov_speed
+        self.atk_speed      = troops.atk_speed
+        self.is_flying      = troops.is_flying
+        self.hp             = troops.hp
+        self.dph            = troops.dph
+        self.range          = troops.range
+        self.preference     = troops.target_preference
+        self.target         = troops.target_building
+
+        self.registry = warzone.registry
+        self.build_defense_table()
+
+    def build_defense_table(self):
+        """ Static attributes of every defense, one row per defense building """
+        reg = self.registry
+        self.def_ids = reg.def_ids
+        self.def_cy = reg.centroid_y[self.def_ids]
+        self.def_cx = reg.centroid_x[self.def_ids]
+        self.def_min_range = reg.min_range[self.def_ids] / SCALE_FACTOR
+        self.def_max_range = reg.max_range[self.def_ids] / SCALE_FACTOR
+        self.def_dph = reg.dph[self.def_ids]
+        self.def_atk_speed = reg.atk_speed[self.def_ids]
+        domain = reg.target_domain[self.def_ids]
+        self.def_hit_air = (domain == 3) | (domain == 2)
+        self.def_hit_ground = (domain == 3) | (domain == 1)
+
+    def alive_ids(self) -> np.ndarray:
+        return self.warzone.slots.alive_ids()
+
+    # Troop phase
+
+    def update_troops(self):
+        """ Retarget, move and resolve attacks of every alive troop """
+        wz = self.warzone
+
+        #   - Troops with no target should get a target and a path
+        alive = self.alive_ids()
+        targetless = alive[self.target[alive] == -1]
+        if len(targetless):
+            wz.reassign_targets(targetless)
+        for troopID in targetless:
+            wz.request_path(troopID)
+        if wz.path_jobs:
+            wz.process_path_jobs()
+
+        if len(alive) == 0:
+            return
+
+        self.move_troops(alive)
+        self.troops_attack(alive)
+
+    def move_troops(self, alive: np.ndarray):
+        """ Advance every troop with a pending path one step toward its next waypoint """
+        paths = self.warzone.paths
+        moving = alive[paths.pending(alive)]
+        if len(moving) == 0:
+            return
+
+        waypoints = paths.next_waypoints(moving).astype(float)
+        is_last = paths.is_last(moving)
+
+        py = self.pos_y[moving] / SCALE_FACTOR
+        px = self.pos_x[moving] / SCALE_FACTOR
+        wy, wx = waypoints[:, 0], waypoints[:, 1]
+        D = np.sqrt((wy - py) ** 2 + (wx - px) ** 2)
+        d = self.mov_speed[moving] / SCALE_FACTOR
+        reached = d > D
+
+        #   - Troops within one stride of the waypoint consume it, snapping on the last one
+        snap = reached & is_last
+        self.pos_y[moving[snap]] = (wy[snap] * SCALE_FACTOR).astype(int)
+        self.pos_x[moving[snap]] = (wx[snap] * SCALE_FACTOR).astype(int)
+        paths.advance(moving[reached])
+
+        #   - The rest take a full stride toward it
+        step = ~reached
+        frac = d[step] / D[step]
+        self.pos_y[moving[step]] = (np.round(py[step] + (wy[step] - py[step]) * frac, 4) * SCALE_FACTOR).astype(int)
+        self.pos_x[moving[step]] = (np.round(px[step] + (wx[step] - px[step]) * frac, 4) * SCALE_FACTOR).astype(int)
+
+    def target_in_range(self, troopIDs: np.ndarray) -> np.ndarray:
+        """ Mask of troops whose target has a tile within attack range or melee reach """
+        target = self.target[troopIDs]
+        py = self.pos_y[troopIDs] / SCALE_FACTOR
+        px = self.pos_x[troopIDs] / SCALE_FACTOR
+
+        # Footprints are rectangles, so the nearest tile is the rounded position clamped per axis
+        reg = self.registry
+        ny = np.clip(np.round(py), reg.y0[target], reg.y1[target])
+        nx = np.clip(np.round(px), reg.x0[target], reg.x1[target])
+        dist = np.sqrt((ny - py) ** 2 + (nx - px) ** 2)
+        reach = np.maximum(self.range[troopIDs] / SCALE_FACTOR, self.MELEE_REACH)
+        return (target != -1) & (dist <= reach)
+
+    def troops_attack(self, alive: np.ndarray):
+        """ Tick the attack cooldown of troops in range and apply every landed hit at once """
+        wz = self.warzone
+        reg = self.registry
+
+        attackers = alive[self.target_in_range(alive)]
+        if len(attackers) == 0:
+            return
+
+        steps = self.steps_hit[attackers]
+        self.steps_hit[attackers] = (steps + MILISECONDS_PER_FRAME) % self.atk_speed[attackers]
+        shooters = attackers[steps == 0]
+        if len(shooters) == 0:
+            return
+
+        targets = self.target[shooters]
+        targetType = reg.building_type[targets]
+        preference = self.preference[shooters]
+        dph = self.dph[shooters].astype(np.int64)
+        dph[(preference == TroopBase.PREFER_WALL) & (targetType == BaseBuilding.TYPE_WALL)] *= 100
+        dph[(preference == TroopBase.PREFER_RESOURCE) & (targetType == BaseBuilding.TYPE_RESOURCE)] *= 2
+
+        # Many hits on one building are summed before being applied
+        damage = np.zeros(reg.n_ids, dtype=np.int64)
+        np.add.at(damage, targets, dph)
+        hitIDs, applied, destroyedIDs = reg.apply_damage(damage)
+
+        #   - Wall breakers blow up with their hit
+        bombers = shooters[(preference == TroopBase.PREFER_WALL) & (dph > 0)]
+        if len(bombers):
+            wz.troops_lost += len(bombers)
+            wz.damage_troops += int(self.hp[bombers].sum())
+            self.hp[bombers] = 0
+            wz.slots.died(bombers)
+
+        for buildingID, damageDone in zip(hitIDs, applied):
+            buildingID = int(buildingID)
+            buildingType = reg.building_type[buildingID]
+
+            if buildingType == BaseBuilding.TYPE_RESOURCE:
+                # Loot Resource based on damage inflicted on it
+                loot_gold_amount = damageDone * wz.total_gold_map[buildingID] / wz.total_hp_map[buildingID]
+                loot_elixir_amount = damageDone * wz.total_elixir_map[buildingID] / wz.total_hp_map[buildingID]
+                reg.loot(buildingID, loot_gold_amount, loot_elixir_amount)
+                wz.loot_gold = min(wz.loot_gold + loot_gold_amount, wz.total_gold)
+                wz.loot_elixir = min(wz.loot_elixir + loot_elixir_amount, wz.total_elixir)
+
+            if buildingType != BaseBuilding.TYPE_WALL:
+                wz.damage_buildings += damageDone
+                wz.building_damage_map[buildingID] = wz.building_damage_map.get(buildingID, 0) + damageDone
+
+        for buildingID in destroyedIDs:
+            buildingID = int(buildingID)
+            buildingType = reg.building_type[buildingID]
+            if buildingType == BaseBuilding.TYPE_DEFENSE:
+                wz.broke_defense_building = True
+            if buildingID == wz.townhall_building_id:
+                wz.townhall_destroyed = True
+                wz.broke_townhall_in_move = True
+            if buildingType != BaseBuilding.TYPE_WALL:
+                wz.destroyed_building_hp += wz.total_hp_map[buildingID]
+                wz.destroyed_buildings_count += 1
+
+        # Troops bound to the fallen buildings retarget
+        if len(destroyedIDs):
+            wz.buildings_destroyed(destroyedIDs)
+
+    # Defense phase
+
+    def update_defenses(self):
+        """ Keep or acquire a target for every standing defense and resolve their shots together """
+        wz = self.warzone
+        reg = self.registry
+        if len(self.def_ids) == 0:
+            return
+
+        standing = reg.hp[self.def_ids] > 0
+        target = reg.target_troop[self.def_ids]
+        timer = reg.steps_since_last_shoot[self.def_ids]
+
+        alive = self.alive_ids()
+        if len(alive) == 0:
+            return
+
+        py = self.pos_y[alive] / SCALE_FACTOR
+        px = self.pos_x[alive] / SCALE_FACTOR
+        flying = self.is_flying[alive] == 1
+
+        dist = np.sqrt((self.def_cy[:, None] - py[None, :]) ** 2 + (self.def_cx[:, None] - px[None, :]) ** 2)
+        domainOk = np.where(flying[None, :], self.def_hit_air[:, None], self.def_hit_ground[:, None])
+        inBand = (self.def_min_range[:, None] <= dist) & (dist <= self.def_max_range[:, None]) & domainOk
+        inBand &= standing[:, None]
+
+        # Column of each defense's current target among the alive troops
+        column = np.full(self.troopSpace.shape[0] + 1, -1, dtype=int)
+        column[alive] = np.arange(len(alive))
+        targetCol = column[target]
+        keep = standing & (targetCol >= 0)
+        keep[keep] = inBand[np.nonzero(keep)[0], targetCol[keep]]
+
+        #   - Defenses locked on a valid target tick their cooldown and may fire
+        fire = keep & (timer == 0)
+        timer[keep] = (timer[keep] + MILISECONDS_PER_FRAME) % self.def_atk_speed[keep]
+
+        #   - The others pick the first alive troop inside their annulus
+        acquire = standing & ~keep & inBand.any(axis=1)
+        previous = target[acquire]
+        target[acquire] = alive[np.argmax(inBand[acquire], axis=1)]
+        wz.targets.lock(self.def_ids[acquire], target[acquire], previous)
+        reg.target_troop[self.def_ids] = target
+
+        if np.any(fire):
+            damage = np.zeros(self.troopSpace.shape[0], dtype=np.int64)
+            np.add.at(damage, target[fire], self.def_dph[fire])
+            hitIDs = np.nonzero(damage)[0]
+            applied = np.minimum(damage[hitIDs], self.hp[hitIDs])
+            self.hp[hitIDs] -= applied.astype(self.hp.dtype)
+            wz.damage_troops += int(applied.sum())
+
+            dead = hitIDs[self.hp[hitIDs] == 0]
+            wz.troops_lost += len(dead)
+            wz.slots.died(dead)
+            reg.target_troop[wz.targets.release_troops(dead)] = -1
+
+        reg.steps_since_last_shoot[self.def_ids] = timer
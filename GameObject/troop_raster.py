@@ -0,0 +1,47 @@
+import numpy as np
+from .state_views import TroopView
+from .troop_slots import TroopSlots
+from .config import *
+
+
+class TroopRaster:
+    """
+    Troops alive rasterized onto the base grid.
+
+    For every tile the number of ground and flying troops on it and their
+    summed HP, so a convolutional policy sees the troops aligned with the
+    base channels instead of as a table. A troop counts on the tile its
+    position rounds to. The raster is rebuilt in place from the live troops
+    with one scatter-add per channel pair when an observation is emitted.
+    """
+
+    MAPPING = {
+        "ground_count": 0,
+        "air_count": 1,
+        "ground_hp": 2,
+        "air_hp": 3,
+    }
+
+    def __init__(self, troops: TroopView, slots: TroopSlots):
+        self.troops = troops
+        self.slots = slots
+        self.space = np.zeros((BASE_WIDTH, BASE_WIDTH, len(self.MAPPING)), dtype=int)
+        # Channels last, so the count and HP of a troop sit at a fixed offset from its tile
+        self.flat = self.space.reshape(-1)
+
+    def reset(self):
+        self.space.fill(0)
+
+    def rasterize(self):
+        self.space.fill(0)
+        alive = self.slots.active[:self.slots.count]
+        if len(alive) == 0:
+            return
+
+        troops = self.troops
+        tileY = np.clip(np.round(troops.pos_y[alive] / SCALE_FACTOR).astype(int), 0, BASE_WIDTH - 1)
+        tileX = np.clip(np.round(troops.pos_x[alive] / SCALE_FACTOR).astype(int), 0, BASE_WIDTH - 1)
+        # Ground count or air count, the HP channels follow two further
+        index = (tileY * BASE_WIDTH + tileX) * len(self.MAPPING) + (troops.is_flying[alive] == 1)
+        np.add.at(self.flat, index, 1)
+        np.add.at(self.flat, index + self.MAPPING["ground_hp"], troops.hp[alive])
@@ -0,0 +1,57 @@
+import numpy as np
+from collections import deque
+from .state_views import TroopView
+
+
+class TroopSlots:
+    """
+    Slot allocator of the troop space.
+
+    The troop space holds one row per housing unit of the camp. Unused rows
+    wait in a free list, lowest first, and rows of dead troops join its end,
+    so a deploy takes the same row as a scan for the first unused one and a
+    dead troop's row is only reused once the fresh ones ran out. The IDs of
+    the troops alive are kept in a dense array, in increasing order like a
+    scan of the whole troop space returns them, and updated on deploy and
+    death, so per-tick code only touches live troops.
+    """
+
+    def __init__(self, troops: TroopView):
+        self.troop_id = troops.troopID
+        self.hp = troops.hp
+        self.active = np.empty(len(troops.space), dtype=int)
+        self.reset()
+
+    def reset(self):
+        """ Rebuild from the troop space, after the caller restored it """
+        self.free = deque(np.nonzero(self.troop_id == -1)[0].tolist())
+        alive = np.nonzero((self.troop_id != -1) & (self.hp > 0))[0]
+        self.count = len(alive)
+        self.active[:self.count] = alive
+
+    def next_free(self) -> int:
+        """ Row the next deployed troop goes to """
+        return self.free[0]
+
+    def is_reused(self, troopID: int) -> bool:
+        """ The row held a troop that died earlier in the episode """
+        return self.troop_id[troopID] != -1
+
+    def deployed(self, troopID: int):
+        assert self.free[0] == troopID
+        self.free.popleft()
+        position = np.searchsorted(self.active[:self.count], troopID)
+        self.active[position + 1:self.count + 1] = self.active[position:self.count]
+        self.active[position] = troopID
+        self.count += 1
+
+    def died(self, troopIDs: np.ndarray):
+        active = self.active[:self.count]
+        dead = np.isin(active, troopIDs)
+        self.free.extend(active[dead].tolist())
+        alive = active[~dead]
+        self.count = len(alive)
+        self.active[:self.count] = alive
+
+    def alive_ids(self) -> np.ndarray:
+        return self.active[:self.count].copy()
@@ -40,6 +40,9 @@ class Base:
         "steps_since_last_shoot": 14
     }
 
+    # Bumped on every layout edit so cached state spaces know when to rebuild
+    version = 0
+
     def __init__(self, townHallLevel: int = 1):
         self.world = np.ones((self.HEIGHT_WORLD, self.WIDTH_WORLD), dtype=int) * -1
         self.townHallLevel      = townHallLevel
@@ -54,6 +57,7 @@ class Base:
         self.buildingDirectory  = BuildingDirectory(self.townHallLevel)
         self.placedBuildings.clear()
         self.buildingCount.clear()
+        self.version += 1
 
     def getBuildingCount(self, name):
         return self.buildingCount.get(name, 0)
@@ -126,6 +130,7 @@ class Base:
         else:
             self.buildingCount[building.name] += 1
 
+        self.version += 1
         return True
     
     def getBuildingFromPosition(self, y: int, x: int) -> BaseBuilding:
@@ -153,6 +158,7 @@ class Base:
         # Remove the building from the placedBuildings dictionary
         del self.placedBuildings[buildingId]
         self.buildingCount[building.name] -= 1
+        self.version += 1
         return True
     
     def getEmptyTileMask(self):
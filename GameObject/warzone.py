@@ -4,26 +4,67 @@ from .troops import *
 import heapq
 import numpy as np
 from .config import *
+from .registry import BuildingRegistry
+from .tick_engine import TickEngine
+from .flow_field import FlowFieldCache
+from .jump_point import JumpPointSearch
+from .path_cache import PathCache
+from .field_store import load_ground_fields
+from .compartments import CompartmentGraph
+from .features import BaseFeatures
+from .troop_raster import TroopRaster
+from .path_buffer import PathBuffer
+from .nearest import NearestBuildingMaps
+from .targeting import TargetIndex
+from .troop_slots import TroopSlots
+from .state_views import TroopView, DeckView, BaseView
+from collections import OrderedDict
 
 class Warzone:
+
+    # Pathfinding backends of `find_path_target_building`
+    PATHFINDER_ASTAR = "astar"
+    PATHFINDER_FLOW_FIELD = "flow_field"
+    PATHFINDER_JPS = "jps"
+
+    # Replanning after a building falls: every troop retargets, or only the troops it concerns,
+    # keeping their paths or, with flow fields, repairing them
+    REPLAN_FULL = "full"
+    REPLAN_TARGETED = "targeted"
+    REPLAN_INCREMENTAL = "incremental"
+
+    # What troops waiting on a time-sliced path search do meanwhile
+    PATH_WAIT_HOLD = "hold"
+    PATH_WAIT_GREEDY = "greedy"
+
     def __init__(
             self,
             baseSpace: np.ndarray,
             troopSpace: np.ndarray,
-            deckSpace: np.ndarray
+            deckSpace: np.ndarray,
+            pathfinder: str = PATHFINDER_ASTAR,
+            replan_mode: str = REPLAN_FULL,
+            path_cache_size: int = 0,
+            field_cache_dir: str = None,
+            compartments: bool = False,
+            path_budget: int = 0,
+            path_wait: str = PATH_WAIT_HOLD,
+            base_features: bool = False,
+            troop_raster: bool = False
         ):
 
         self.baseSpace = baseSpace
-        self.troopSpace = troopSpace
+        # Column-major so that every troop field is a contiguous array for the tick engine
+        self.troopSpace = np.asfortranarray(troopSpace)
         self.deckSpace = deckSpace
-        self.timestep = 0
+        # Named channel views of the three spaces
+        self.grid = BaseView(self.baseSpace)
+        self.troops = TroopView(self.troopSpace)
+        self.deck = DeckView(self.deckSpace)
+        self.slots = TroopSlots(self.troops)
+        self.registry = BuildingRegistry(self.baseSpace)
         self.maxtimestep = int(180 * 1000 / MILISECONDS_PER_FRAME) # Each step corresponds to 100ms, Total 180s
-        self.paths = dict()
-        for troopID in range(self.troopSpace.shape[0]):
-            self.paths[troopID] = []
-
-        self.destroyed_building_hp = 0
-        self.destroyed_buildings_count = 0
+        self.paths = PathBuffer(self.troopSpace.shape[0])
 
         self.total_hp_map = {}
         self.total_gold_map = {}
@@ -35,6 +76,74 @@ class Warzone:
         self.total_gold = sum(list(self.total_gold_map.values()))
         self.total_elixir = sum(list(self.total_elixir_map.values()))
 
+        self.townhall_building_id = -1
+        self.get_town_hall_buildingID()
+
+        self.engine = TickEngine(self)
+        self.nearest_buildings = NearestBuildingMaps(self.registry)
+        # Troops by target building and defenses by target troop
+        self.targets = TargetIndex(self.troops, self.registry)
+
+        assert pathfinder in (self.PATHFINDER_ASTAR, self.PATHFINDER_FLOW_FIELD, self.PATHFINDER_JPS)
+        self.pathfinder = pathfinder
+        self.flow_fields = FlowFieldCache(self.registry) if pathfinder == self.PATHFINDER_FLOW_FIELD else None
+
+        # Ground fields of the intact base are mapped from disk instead of expanded on the first ticks
+        assert field_cache_dir is None or pathfinder == self.PATHFINDER_FLOW_FIELD
+        if field_cache_dir is not None:
+            self.flow_fields.preload(load_ground_fields(field_cache_dir, self.baseSpace))
+
+        # Walled compartments answer reachability and wall breaking without a search
+        self.compartments = CompartmentGraph(self.registry) if compartments else None
+
+        # Derived per-tile channels of the base for the observation
+        self.features = BaseFeatures(self.registry) if base_features else None
+        # Troops alive per tile for the observation
+        self.troop_raster = TroopRaster(self.troops, self.slots) if troop_raster else None
+
+        # Path searches are time-sliced to `path_budget` expanded nodes per tick, unbounded when 0
+        assert path_wait in (self.PATH_WAIT_HOLD, self.PATH_WAIT_GREEDY)
+        self.path_budget = path_budget
+        self.path_wait = path_wait
+        self.path_jobs = OrderedDict()
+
+        # Incremental replanning repairs the flow fields the troops are following
+        assert replan_mode in (self.REPLAN_FULL, self.REPLAN_TARGETED, self.REPLAN_INCREMENTAL)
+        assert replan_mode != self.REPLAN_INCREMENTAL or pathfinder == self.PATHFINDER_FLOW_FIELD
+        self.replan_mode = replan_mode
+
+        # Paths shared across troops and ticks until a building falls, disabled when 0
+        self.path_cache = PathCache(path_cache_size) if path_cache_size > 0 else None
+
+        self.reset_battle_state()
+
+    def reset(self):
+        """
+        Start a new battle on the same base and deck.
+        The caller restores baseSpace, troopSpace and deckSpace in place beforehand
+        """
+        self.registry.reset()
+        self.slots.reset()
+        self.nearest_buildings.reset()
+        self.targets.reset()
+        self.paths.clear_all()
+        self.path_jobs.clear()
+        self.reset_battle_state()
+        if self.flow_fields is not None:
+            self.flow_fields.reset()
+        if self.compartments is not None:
+            self.compartments.reset()
+        if self.features is not None:
+            self.features.reset()
+        if self.troop_raster is not None:
+            self.troop_raster.reset()
+
+    def reset_battle_state(self):
+        self.timestep = 0
+
+        self.destroyed_building_hp = 0
+        self.destroyed_buildings_count = 0
+
         self.damage_buildings = 0
         self.damage_troops = 0
         self.troops_lost = 0
@@ -45,15 +154,16 @@ class Warzone:
 
         self.building_damage_map = {}
 
-        self.townhall_building_id = -1
         self.townhall_destroyed = False
 
         self.destruction_percentage = 0.0
 
-        self.get_town_hall_buildingID()
-
         self.stars = 0
 
+        # Search effort of the A* and JPS backends
+        self.path_searches = 0
+        self.path_expanded_nodes = 0
+
         # Reward factors
         self.stars_earned_in_move = 0
         self.cumulative_damage_in_move = 0
@@ -70,31 +180,12 @@ class Warzone:
 
 
     def populate_total_hp_n_resources_of_base(self) -> None:
-        wall_mask = self.baseSpace[:, :, Base.GRID_MAPPING["building_type"]] != BaseBuilding.TYPE_WALL
-        destructable_mask = self.baseSpace[:, :, Base.GRID_MAPPING["building_remaining_hp"]] > 0
-        buildingID_grid = self.baseSpace[:, :, Base.GRID_MAPPING["buildingID"]]
-        final_mask = np.bitwise_and(wall_mask, destructable_mask)
-
-        rem_hp_grid = self.baseSpace[:, :, Base.GRID_MAPPING["building_remaining_hp"]]
-        for i in range(rem_hp_grid.shape[0]):
-            for j in range(rem_hp_grid.shape[1]):
-                buildingID = buildingID_grid[i][j]
-                if final_mask[i][j]:
-                    self.total_hp_map[buildingID] = rem_hp_grid[i][j]
-    
-        rem_gold_grid = self.baseSpace[:, :, Base.GRID_MAPPING["gold"]]
-        for i in range(rem_gold_grid.shape[0]):
-            for j in range(rem_gold_grid.shape[1]):
-                buildingID = buildingID_grid[i][j]
-                if final_mask[i][j]:
-                    self.total_gold_map[buildingID] = rem_gold_grid[i][j]
-
-        rem_elixir_grid = rem_hp_grid = self.baseSpace[:, :, Base.GRID_MAPPING["elixir"]]
-        for i in range(rem_elixir_grid.shape[0]):
-            for j in range(rem_elixir_grid.shape[1]):
-                buildingID = buildingID_grid[i][j]
-                if final_mask[i][j]:
-                    self.total_elixir_map[buildingID] = rem_elixir_grid[i][j]
+        reg = self.registry
+        for buildingID in reg.undestroyed_ids():
+            buildingID = int(buildingID)
+            self.total_hp_map[buildingID] = reg.hp[buildingID]
+            self.total_gold_map[buildingID] = reg.gold[buildingID]
+            self.total_elixir_map[buildingID] = reg.elixir[buildingID]
 
 
     def get_reward(self) -> float:
@@ -124,11 +215,7 @@ class Warzone:
         return reward
 
     def get_town_hall_buildingID(self):
-        for y in range(self.baseSpace.shape[0]):
-            for x in range(self.baseSpace.shape[1]):
-                if self.baseSpace[y, x, Base.GRID_MAPPING["building_type"]] == BaseBuilding.TYPE_TOWNHALL:
-                    self.townhall_building_id = self.baseSpace[y, x, Base.GRID_MAPPING["buildingID"]]
-                    return
+        self.townhall_building_id = self.registry.townhall_id
 
     def update(self):
 
@@ -171,54 +258,89 @@ class Warzone:
 
         self.timestep += 1
 
+    def sync_base_space(self):
+        """ Refresh the dynamic channels of baseSpace from the building registry, and the troop raster, called when an observation is emitted """
+        self.registry.write_grid(self.baseSpace)
+        if self.troop_raster is not None:
+            self.troop_raster.rasterize()
+
     def did_end(self) -> bool:
         flag1 = self.timestep >= self.maxtimestep
-        flag2 = len(Deck.get_deck_available_deploy_options(self.deckSpace)) + len(Deck.get_troops_alive_ids(self.deckSpace)) == 0
-        flag3 = len(Base.get_undestroyed_building_ids(self.baseSpace)) == 0
+        flag2 = len(Deck.get_deck_available_deploy_options(self.deckSpace)) + len(self.slots.alive_ids()) == 0
+        flag3 = self.registry.standing_count == 0
         
         return flag1 or flag2 or flag3
 
     def reassign_target_to_single_troop(self, troopID):
-        # Get troop's target preference
-        targetType = Deck.get_troop_target_preference(self.troopSpace, troopID)
-        preferences = TroopDirectory.mapPreferenceToBuildingType(targetType)
-
-        # Get the preference mask for the base
-        preference_mask = Base.get_preference_mask(self.baseSpace, preferences)
-        # Early exit if no valid targets
-        if not np.any(preference_mask):
-            # Fallback to general preference
-            targetType = TroopBase.PREFER_GENERAL
-            preferences = TroopDirectory.mapPreferenceToBuildingType(targetType)
-            preference_mask = Base.get_preference_mask(self.baseSpace, preferences)
-
-            if not np.any(preference_mask):  # Still no targets
-                return
-
-        # Get target positions as (y, x) pairs
-        positions = np.argwhere(preference_mask)
-
-        # Get the troop's current position
-        troopPosition = np.array(Deck.get_troop_pos(self.troopSpace, troopID, unscaled=True))
+        self.reassign_targets(np.array([troopID]))
+
+    def troop_position(self, troopID: int) -> Tuple[float, float]:
+        """ Unscaled (y, x) position of the troop """
+        return self.troops.pos_y[troopID] / SCALE_FACTOR, self.troops.pos_x[troopID] / SCALE_FACTOR
+
+    def troop_tile(self, troopID: int) -> Tuple[int, int]:
+        """ Tile a path search of the troop starts from """
+        y, x = self.troop_position(troopID)
+        return int(y), int(x)
+
+    def reassign_targets(self, troopIDs: np.ndarray):
+        """ Assign the nearest standing building of their preference to the troops, from one gather per class """
+        maps = self.nearest_buildings
+        preference = self.troops.target_preference[troopIDs]
+        posY = self.troops.pos_y[troopIDs] / SCALE_FACTOR
+        posX = self.troops.pos_x[troopIDs] / SCALE_FACTOR
+
+        # Wall breakers go for the walls that open their compartment up
+        pending = np.ones(len(troopIDs), dtype=bool)
+        if self.compartments is not None:
+            for i in np.nonzero(preference == TroopBase.PREFER_WALL)[0]:
+                pending[i] = not self.reassign_wall_breaker(troopIDs[i])
+
+        # Unknown preferences have no building types, like an empty class they fall back to general
+        preference = np.where(np.isin(preference, maps.PREFERENCES), preference, TroopBase.PREFER_GENERAL)
+        targets = np.full(len(troopIDs), maps.NONE, dtype=int)
+        for targetType in np.unique(preference[pending]):
+            rows = np.nonzero(pending & (preference == targetType))[0]
+            if len(maps.members[targetType]) == 0:
+                # Fallback to general preference
+                preference[rows] = targetType = TroopBase.PREFER_GENERAL
+            targets[rows] = maps.lookup(targetType, posY[rows], posX[rows])
+
+        #   - Troops near the boundary between two buildings scan the tiles
+        for i in np.nonzero(pending & (targets == maps.AMBIGUOUS))[0]:
+            targets[i] = self.nearest_building_scan(preference[i], (posY[i], posX[i]))
+
+        assign = pending & (targets != maps.NONE)
+        self.targets.assign(troopIDs[assign], targets[assign])
+
+    def nearest_building_scan(self, targetType: int, troopPosition: Tuple[float, float]) -> int:
+        """ Building owning the standing tile of the class closest to the position """
+        # Get the tiles of the standing preferred buildings
+        positions = self.registry.standing_tiles(TroopDirectory.mapPreferenceToBuildingType(targetType))
 
         # Compute distances efficiently using NumPy broadcasting
-        distances = np.linalg.norm(positions - troopPosition, axis=1)
+        distances = np.linalg.norm(positions - np.array(troopPosition), axis=1)
 
         # Find the closest target
-        closest_idx = np.argmin(distances)
-        closest_position = tuple(positions[closest_idx])
-
-        # Assign target to troop
-        targetID = Base.get_buildingID_for_position(self.baseSpace, closest_position)
-        Deck.troop_assign_target(self.troopSpace, troopID, targetID)
-
+        closest_position = tuple(positions[np.argmin(distances)])
+        return int(self.grid.buildingID[closest_position])
+
+    def reassign_wall_breaker(self, troopID) -> bool:
+        """ Target the nearest wall between the troop's compartment and another one, False if there is none """
+        y, x = self.troop_position(troopID)
+        wallIDs = self.compartments.separating_walls((int(y), int(x)))
+        if not wallIDs:
+            return False
+
+        locations = [self.registry.location(wallID) for wallID in wallIDs]
+        distances = [np.min((ys - y) ** 2 + (xs - x) ** 2) for ys, xs in locations]
+        self.targets.assign(troopID, wallIDs[int(np.argmin(distances))])
+        return True
 
     def reassign_target_to_all_troops(self):
-        troopIDs = Deck.get_troops_alive_ids(self.troopSpace)
         #   - Find nearest target for each troop
-        #   - based on preference masking and assign it to them
-        for troopID in troopIDs:
-            self.reassign_target_to_single_troop(troopID)
+        #   - based on the nearest building maps and assign it to them
+        self.reassign_targets(self.slots.alive_ids())
 
 
     def _helper_get_tile_neighbour(self, tile) -> List[Tuple[int, int]]:
@@ -241,15 +363,263 @@ class Warzone:
         return D * max(dx, dy) + (D2 - D) * min(dx, dy)
     
 
+    @staticmethod
+    def run_search(steps):
+        """ Run a resumable path search to completion and return its result """
+        while True:
+            try:
+                next(steps)
+            except StopIteration as result:
+                return result.value
+
+    def request_path(self, troopID: int):
+        """ Plan the path now, or queue it behind the searches of this tick when time-sliced """
+        if not self.path_budget:
+            return self.find_path_target_building(troopID)
+
+        # A newer request replaces the pending one and goes to the back of the queue
+        self.paths.clear(troopID)
+        self.path_jobs.pop(troopID, None)
+        self.path_jobs[troopID] = (self.find_path_steps(troopID), None, self.path_wait)
+
+    def process_path_jobs(self):
+        """ Resume the queued searches in order until the node budget of the tick is spent """
+        budget = self.path_budget
+        hp = self.troops.hp
+        while self.path_jobs and budget > 0:
+            troopID, (steps, start, wait) = next(iter(self.path_jobs.items()))
+            if hp[troopID] <= 0:
+                del self.path_jobs[troopID]
+                continue
+
+            if start is None:
+                # The search takes the tile of the troop when it first runs
+                start = self.troop_tile(troopID)
+                self.path_jobs[troopID] = (steps, start, wait)
+
+            # Drop the greedy waypoint, a finishing search writes the full path
+            self.paths.clear(troopID)
+            for _ in steps:
+                budget -= 1
+                if budget <= 0:
+                    break
+            else:
+                del self.path_jobs[troopID]
+                self.splice_path(troopID, start)
+
+        for troopID, (_steps, _start, wait) in self.path_jobs.items():
+            if wait == self.PATH_WAIT_GREEDY:
+                self.step_greedily(troopID)
+
+    def restart_path_jobs(self):
+        """
+        Suspended ground searches plan on the walls standing when they started and could settle
+        on a fallen wall as barrier. Start them over from the troop's tile, keeping their turn
+        """
+        for troopID, (_steps, start, wait) in self.path_jobs.items():
+            if start is not None and not self.troops.is_flying[troopID]:
+                self.path_jobs[troopID] = (self.find_path_steps(troopID), None, wait)
+
+    def splice_path(self, troopID: int, start: Tuple[int, int]):
+        """
+        A path searched while the troop stepped greedily starts from the tile it was requested on.
+        Follow it from the tile the troop is on now, or search again from there, holding meanwhile
+        """
+        tile = self.troop_tile(troopID)
+        if tile == start:
+            return
+
+        tiles = self.paths.tiles(troopID)
+        if tile in tiles:
+            self.paths.set(troopID, tiles[tiles.index(tile) + 1:])
+            return
+
+        # The restarted search holds, so the troop cannot walk off its start tile again
+        self.paths.clear(troopID)
+        self.path_jobs[troopID] = (self.find_path_steps(troopID), None, self.PATH_WAIT_HOLD)
+
+    def step_greedily(self, troopID: int):
+        """ Waypoint to the neighbouring tile toward the target if it is passable, hold position otherwise """
+        targetID = self.troops.target_building[troopID]
+        self.paths.clear(troopID)
+        if targetID == -1:
+            return
+
+        reg = self.registry
+        y, x = self.troop_position(troopID)
+        y, x = int(y), int(x)
+        ny = y + int(np.sign(min(max(y, reg.y0[targetID]), reg.y1[targetID]) - y))
+        nx = x + int(np.sign(min(max(x, reg.x0[targetID]), reg.x1[targetID]) - x))
+        if (ny, nx) != (y, x) and reg.passable_mask(self.troops.is_flying[troopID])[ny, nx]:
+            self.paths.set(troopID, [(ny, nx)])
+
     def find_path_target_building(self, troopID: int):
-        start = Deck.get_troop_pos(self.troopSpace, troopID, unscaled=True)
-        targetID = Deck.get_troop_target_building(self.troopSpace, troopID)
-        targetPositions = Base.get_building_location(self.baseSpace, targetID)
+        """ Plan the path of the troop toward its target, reusing a cached plan from the same tile if any """
+        return self.run_search(self.find_path_steps(troopID))
+
+    def find_path_steps(self, troopID: int):
+        """ Resumable `find_path_target_building`, yields after every expanded node """
+        if self.path_cache is None:
+            return (yield from self.plan_path_steps(troopID))
+
+        start = self.troop_position(troopID)
+        key = (
+            (int(start[0]), int(start[1])),
+            int(self.troops.target_building[troopID]),
+            bool(self.troops.is_flying[troopID]),
+            float(self.troops.range[troopID] / SCALE_FACTOR),
+            self.registry.passability_version
+        )
+        entry = self.path_cache.get(key)
+        if entry is not None:
+            # A plan may have swapped the target for the wall in the way
+            found, path, targetID = entry
+            self.paths.set(troopID, path)
+            self.targets.assign(troopID, targetID)
+            return found
+
+        found = yield from self.plan_path_steps(troopID)
+        self.path_cache.put(key, (found, tuple(self.paths.tiles(troopID)), int(self.troops.target_building[troopID])))
+        return found
+
+    def plan_path(self, troopID: int):
+        """ Plan the path of the troop toward its target with the selected backend """
+        return self.run_search(self.plan_path_steps(troopID))
+
+    def plan_path_steps(self, troopID: int):
+        """ Resumable `plan_path`, yields after every expanded node """
+        if self.compartments is not None and not self.troops.is_flying[troopID]:
+            # Walled off targets are swapped for the wall to break before searching
+            start = self.troop_position(troopID)
+            tile = (int(start[0]), int(start[1]))
+            targetID = self.troops.target_building[troopID]
+            if targetID != -1 and not self.compartments.reachable(tile, targetID):
+                wallID = self.compartments.wall_to_break(tile, targetID)
+                if wallID != -1:
+                    self.targets.assign(troopID, wallID)
+
+        if self.pathfinder == self.PATHFINDER_FLOW_FIELD:
+            # A field lookup counts as one node, a missing field is expanded in one go
+            yield
+            return self.find_path_flow_field(troopID)
+        if self.pathfinder == self.PATHFINDER_JPS:
+            return (yield from self.find_path_jps_steps(troopID))
+        return (yield from self.find_path_astar_steps(troopID))
+
+    def planning_range(self, troopID: int) -> float:
+        """
+        Goal range of a path search. With compartments, a standing wall target is reached
+        from any adjacent tile, as the engine does, instead of through the barrier fallback
+        """
+        troopRange = self.troops.range[troopID] / SCALE_FACTOR
+        targetID = self.troops.target_building[troopID]
+        if self.compartments is not None and targetID != -1 and self.registry.is_wall[targetID]:
+            return max(troopRange, TickEngine.MELEE_REACH)
+        return troopRange
+
+    def find_path_jps(self, troopID: int):
+        return self.run_search(self.find_path_jps_steps(troopID))
+
+    def find_path_jps_steps(self, troopID: int):
+        start = self.troop_position(troopID)
+        targetID = self.troops.target_building[troopID]
+        targetPositions = self.registry.location(targetID)
+        goal = min(zip(targetPositions[0], targetPositions[1]),
+                              key = lambda pos: np.sqrt(pow(pos[0] - start[0], 2) + pow(pos[1] - start[1], 2)))
+
+        troopRange = self.planning_range(troopID)
+        isFlying = self.troops.is_flying[troopID]
+
+        self.paths.clear(troopID)
+        search = JumpPointSearch(self.registry.passable_mask(isFlying), (int(goal[0]), int(goal[1])), troopRange)
+        self.path_searches += 1
+        waypoints, closest_barrier = yield from search.search_steps((int(start[0]), int(start[1])))
+        self.path_expanded_nodes += search.expanded
+
+        if waypoints is None:
+            return False
+
+        if closest_barrier is not None:
+            buildingID = self.grid.buildingID[closest_barrier]
+            buildingType = self.grid.building_type[closest_barrier]
+            # Just for debug, ensure that the barrier building is wall
+            assert(buildingType == BaseBuilding.TYPE_WALL)
+            self.targets.assign(troopID, buildingID)
+
+        self.paths.set_segments(troopID, waypoints)
+        return True
+
+    def find_path_flow_field(self, troopID: int):
+        start = self.troop_position(troopID)
+        targetID = self.troops.target_building[troopID]
+        troopRange = self.planning_range(troopID)
+        isFlying = self.troops.is_flying[troopID]
+
+        self.paths.clear(troopID)
+        if targetID == -1:
+            return False
+        n, barrierID = self.flow_fields.follow_into(self.paths.buffer[troopID], targetID, (int(start[0]), int(start[1])), troopRange, isFlying)
+        if barrierID != -1:
+            # The target is walled off, break through the wall in the way first
+            self.targets.assign(troopID, barrierID)
+
+        self.paths.set_written(troopID, n)
+        return True
+
+    def buildings_destroyed(self, destroyedIDs: np.ndarray):
+        """ Called by the engine with the IDs of the buildings destroyed on this tick """
+        self.nearest_buildings.buildings_destroyed(destroyedIDs)
+        if self.compartments is not None:
+            self.compartments.walls_destroyed(destroyedIDs[self.registry.is_wall[destroyedIDs]])
+        if self.features is not None:
+            self.features.defenses_destroyed(destroyedIDs)
+        if self.path_jobs and self.registry.is_wall[destroyedIDs].any():
+            self.restart_path_jobs()
+
+        if self.replan_mode == self.REPLAN_INCREMENTAL:
+            self.replan_incremental(destroyedIDs)
+            return
+
+        if self.flow_fields is not None:
+            self.flow_fields.invalidate(destroyedIDs)
+        if self.replan_mode == self.REPLAN_TARGETED:
+            # Only the troops bound to the fallen buildings retarget, the others keep their paths
+            self.targets.release_buildings(destroyedIDs)
+        else:
+            # Every troop forgets its target and starts afresh
+            self.targets.forget_all()
+
+    def replan_incremental(self, destroyedIDs: np.ndarray):
+        """
+        Only the troops whose target fell retarget. The fields blocked by fallen walls are
+        repaired, and a troop keeps its path unless the repair shortened the way from its tile
+        """
+        improved = self.flow_fields.repair(destroyedIDs)
+        self.targets.release_buildings(destroyedIDs)
+        if not improved:
+            return
+
+        engine = self.engine
+        for troopID in engine.alive_ids():
+            key = (int(engine.target[troopID]), bool(engine.is_flying[troopID]))
+            if key not in improved:
+                continue
+            tile = (int(engine.pos_y[troopID] / SCALE_FACTOR), int(engine.pos_x[troopID] / SCALE_FACTOR))
+            if improved[key][tile]:
+                self.find_path_flow_field(troopID)
+
+    def find_path_astar(self, troopID: int):
+        return self.run_search(self.find_path_astar_steps(troopID))
+
+    def find_path_astar_steps(self, troopID: int):
+        start = self.troop_position(troopID)
+        targetID = self.troops.target_building[troopID]
+        targetPositions = self.registry.location(targetID)
         goal = min(zip(targetPositions[0], targetPositions[1]),
                               key = lambda pos: np.sqrt(pow(pos[0] - start[0], 2) + pow(pos[1] - start[1], 2)))
         
-        troopRange = Deck.get_troop_range(self.troopSpace, troopID, unscaled=True)
-        isFlying = Deck.get_troop_is_flying(self.troopSpace, troopID)
+        troopRange = self.planning_range(troopID)
+        isFlying = self.troops.is_flying[troopID]
 
         start_y, start_x = int(start[0]), int(start[1])
         open_set = [(0, (start_y, start_x))]
@@ -258,12 +628,11 @@ class Warzone:
         f_score = { (start_y, start_x): self.heuristic(start, goal) }
 
         min_heuristic = float('inf')
-        passable_mask = Base.get_passable_mask(self.baseSpace, isFlying)
+        passable_mask = self.registry.passable_mask(isFlying)
         closest_barrier = None
         aux_goal = None
 
-        if troopID in self.paths:
-            self.paths[troopID].clear()
+        self.paths.clear(troopID)
 
         def goal_test(pos: Tuple[float, float]) -> bool:
             dist = np.sqrt(pow(pos[0] - goal[0], 2) + pow(pos[1] - goal[1], 2))
@@ -273,8 +642,11 @@ class Warzone:
             y, x = int(pos[0]), int(pos[1])
             return passable_mask[y, x]
 
+        self.path_searches += 1
         while open_set:
             _, pos = heapq.heappop(open_set)
+            self.path_expanded_nodes += 1
+            yield
             if goal_test(pos):
                 aux_goal = pos
                 break
@@ -299,195 +671,67 @@ class Warzone:
             if closest_barrier is None or closest_barrier not in came_from:
                 return False
             
-            buildingID = Base.get_buildingID_for_position(self.baseSpace, closest_barrier)
-            buildingType = Base.get_building_type_for_position(self.baseSpace, closest_barrier)
+            buildingID = self.grid.buildingID[closest_barrier]
+            buildingType = self.grid.building_type[closest_barrier]
             # Just for debug, ensure that the barrier building is wall
             assert(buildingType == BaseBuilding.TYPE_WALL)
 
-            Deck.troop_assign_target(self.troopSpace, troopID, buildingID)
+            self.targets.assign(troopID, buildingID)
 
             # ISSUE: Troop reaches the wall position, and on forget target,
             # it crosses the wall, since it was on the wall and didn't percieved it as barrier 
 
-            current = came_from[closest_barrier]
-            while current != (start_y, start_x):
-                self.paths[troopID].append(current)
-                current = came_from[current]
+            self.paths.set_chain(troopID, came_from, came_from[closest_barrier], (start_y, start_x))
             return True
         
         # Reconstruct the path to the reachable cell if the goal is in range
-        current = aux_goal
-        while current != (start_y, start_x):
-            self.paths[troopID].append(current)
-            current = came_from[current]
+        self.paths.set_chain(troopID, came_from, aux_goal, (start_y, start_x))
         return True
     
 
+    def is_valid_deploy(self, deckID: int, position: Tuple[int, int]) -> bool:
+        """ A deck slot deployed on an empty tile, a SkipMove is valid whatever tile it names """
+        if deckID == Deck.DECK_NAME_MAPS_ID["SkipMove"]:
+            return True
+        return 0 <= deckID < len(self.deckSpace[:, 0]) and self.grid.building_type[position] == BaseBuilding.TYPE_EMPTY
+
     def deploy_troop(self, deckID: int, position: Tuple[int, int]) -> bool:
-        # Perform the deploy action given by the gym environment update
-        if 0 <= deckID < len(self.deckSpace[:, 0]) and Base.get_building_type_for_position(self.baseSpace, position) == BaseBuilding.TYPE_EMPTY:
-            troopID = Deck.get_available_troopID(self.troopSpace)
-            deployed =  Deck.deploy_troop_from_deck(self.deckSpace, self.troopSpace, deckID, troopID, position)
+        # Perform the deploy action given by the gym environment update, returns whether it was valid
+        if not self.is_valid_deploy(deckID, position):
+            self.made_invalid_action_in_move = True
+            return False
+
+        if deckID != Deck.DECK_NAME_MAPS_ID["SkipMove"]:
+            deployed = self.spawn_troop(deckID, position)
             self.troops_deployed += deployed
             self.troops_deployed_in_move = deployed
-        else:
-            self.made_invalid_action_in_move = True
-    
-    def _helper_troop_target_in_range(self, troopID):
-
-        troopPos = Deck.get_troop_pos(self.troopSpace, troopID, unscaled=True)
-        targetID = Deck.get_troop_target_building(self.troopSpace, troopID)
-        troopRange = Deck.get_troop_range(self.troopSpace, troopID, unscaled=True)
-
-        if targetID == -1: return False
-        positions = Base.get_building_location(self.baseSpace, targetID)
-        for y, x in zip(positions[0], positions[1]):
-            dist = np.sqrt(pow(y-troopPos[0], 2) + pow(x-troopPos[1], 2))
-            if dist <= troopRange or dist <= 1.415:
-                return True
-        
-        return False
+        return True
 
+    def spawn_troop(self, deckID: int, position: Tuple[int, int]) -> bool:
+        """ Deploy a troop of the deck member into the next free slot of the troop space """
+        if self.deck.count[deckID] <= 0:
+            return False
+
+        troopID = self.slots.next_free()
+        if self.slots.is_reused(troopID):
+            # The dead troop that held the slot leaves nothing behind
+            self.paths.clear(troopID)
+            self.path_jobs.pop(troopID, None)
+            self.registry.target_troop[self.targets.release_troops(troopID)] = -1
+
+        deployed = Deck.deploy_troop_from_deck(self.deckSpace, self.troopSpace, deckID, troopID, position)
+        if deployed:
+            self.slots.deployed(troopID)
+        return deployed
+    
     def update_troop(self):
         ### Troops Update
-        #   - Troops with no target should get a target
-        targetlessTroop = Deck.get_targetless_troopID(self.troopSpace)
-
-        for troopID in targetlessTroop:
-            self.reassign_target_to_single_troop(troopID)
-            self.find_path_target_building(troopID)
-        #   - Troops with target should move toward target
-
-        for troopID in Deck.get_troops_alive_ids(self.troopSpace):
-            troopID = troopID
-            if len(self.paths[troopID]) != 0:
-                next_pos = self.paths[troopID][-1]
-                if Deck.troop_move(self.troopSpace, troopID, next_pos, len(self.paths[troopID]) == 1):
-                    self.paths[troopID].pop()
-                    return
-
-            if self._helper_troop_target_in_range(troopID):
-                buildingID = Deck.get_troop_target_building(self.troopSpace, troopID)
-                sacrificial_troop = False
-                building_destroyed, damage = Deck.troop_attempts_attack(self.troopSpace, self.baseSpace, troopID)
-                buildingType = Base.get_building_property(self.baseSpace, Deck.get_troop_target_building(self.troopSpace, troopID), "building_type")
-                isWall = buildingType == BaseBuilding.TYPE_WALL
-
-                if buildingType == BaseBuilding.TYPE_RESOURCE:
-                    # Loot Resource based on damage inflicted on it
-                    loot_gold_amount = damage * self.total_gold_map[buildingID] / self.total_hp_map[buildingID]
-                    loot_elixir_amount = damage * self.total_elixir_map[buildingID] / self.total_hp_map[buildingID]
-                    Base.loot_building(self.baseSpace, buildingID, loot_gold_amount, gold=True)
-                    Base.loot_building(self.baseSpace, buildingID, loot_elixir_amount, elixir=True)
-                    self.loot_gold += loot_gold_amount
-                    self.loot_elixir += loot_elixir_amount
-                    #TODO: Fix the loot overflow from the max limit
-                    # Here is the temporary fix
-                    self.loot_gold = min(self.loot_gold, self.total_gold)
-                    self.loot_elixir = min(self.loot_elixir, self.total_elixir)
-
-                # Handle wall breaker
-                if Deck.get_troop_target_preference(self.troopSpace, troopID) == TroopBase.PREFER_WALL and damage > 0:
-                    # Kill the wall breaker
-                    self.troops_lost += 1
-                    remHp = Deck.get_troop_hp(self.troopSpace, troopID)
-                    dead, point = Deck.troop_get_hit(self.troopSpace, troopID, remHp * 1000)
-                    self.damage_troops += point
-
-                # If the destroyed building is not wall, update the records of damage and destruction percentage
-                if not isWall:
-                    self.damage_buildings += damage
-                    if buildingID not in self.building_damage_map:
-                        self.building_damage_map[buildingID] = damage
-                    else:
-                        self.building_damage_map[buildingID] += damage
-
-                # Update the reward parameters on building destruction and every troops forget target and 
-                # starts afresh
-                if building_destroyed:
-                    if buildingType == BaseBuilding.TYPE_DEFENSE:
-                        self.broke_defense_building = True
-                    if buildingID == self.townhall_building_id:
-                        self.townhall_destroyed = True
-                        self.broke_townhall_in_move = True
-                    Deck.troops_forget_target_all(self.troopSpace)
-                    if not isWall:
-                        self.destroyed_building_hp += self.total_hp_map[buildingID]
-                        self.destroyed_buildings_count += 1
-                    return
-                
- 
-    # Methods concerning buildings
-
-    def find_troop_in_range(self, positions) -> bool:
-        # TODO: Test this method
-        y, x = positions[0][0], positions[1][0]
-        centroid_y, centroid_x = int(np.mean(positions[0])), int(np.mean(positions[1]))
-        buildingMinRange = self.baseSpace[y, x, Base.GRID_MAPPING["building_min_atk_range"]] / SCALE_FACTOR
-        buildingMaxRange = self.baseSpace[y, x, Base.GRID_MAPPING["building_max_atk_range"]] / SCALE_FACTOR
-
-        domain = self.baseSpace[y, x, Base.GRID_MAPPING["building_target_domain"]]
-
-        hit_air = domain == 3 or domain == 2
-        hit_ground = domain == 3 or domain == 1
-
-        aliveTroopIDs = Deck.get_troops_alive_ids(self.troopSpace)
-        for troopID in aliveTroopIDs:
-            is_flying = Deck.get_troop_is_flying(self.troopSpace, troopID)
-
-            if is_flying and not hit_air:
-                continue
-
-            if not is_flying and not hit_ground:
-                continue
+        #   - Every alive troop is retargeted, moved and resolved in one vectorized pass
+        self.engine.update_troops()
 
-            target_y, target_x = Deck.get_troop_pos(self.troopSpace, troopID, unscaled=True)
-            if buildingMinRange <= np.sqrt(pow(target_y - centroid_y, 2) + pow(target_x - centroid_x, 2)) <= buildingMaxRange:
-                for y, x in zip(positions[0], positions[1]):
-                    self.baseSpace[y, x, Base.GRID_MAPPING["target_troop_id"]] = troopID
-                return True
-            
-        return False
-    
-    def is_target_troop_in_range(self, positions, targetID: int):
-        # TODO: Test this method
-        y, x = positions[0][0], positions[1][0]
-        centroid_y, centroid_x = int(np.mean(positions[0])), int(np.mean(positions[1]),)
-        target_y, target_x = Deck.get_troop_pos(self.troopSpace, targetID, unscaled=True)
-        buildingMinRange = self.baseSpace[y, x, Base.GRID_MAPPING["building_min_atk_range"]] / SCALE_FACTOR
-        buildingMaxRange = self.baseSpace[y, x, Base.GRID_MAPPING["building_max_atk_range"]] / SCALE_FACTOR
-        return buildingMinRange <= np.sqrt(pow(centroid_y - target_y, 2) + pow(centroid_x - target_x, 2)) <= buildingMaxRange
-
-
-    def building_attack_troop_target(self, buildingID: int, targetID: int, positions) -> bool:
-        return Base.building_attempts_attack(self.baseSpace, self.troopSpace, buildingID, targetID, positions)
-
-    def update_defense_buildings(self, buildingID: int):
-        # TODO: To test this method
-        ### Buildings Update
-        positions = Base.get_building_location(self.baseSpace, buildingID)
-        targetID = Base.get_building_target_troop_ID(self.baseSpace, buildingID)
-        if targetID != -1 and \
-            self.is_target_troop_in_range(positions, targetID) and \
-            Deck.get_troop_hp(self.troopSpace, targetID) > 0:
-            target_dead, damage = self.building_attack_troop_target(buildingID, targetID, positions)
-            if target_dead:
-                Base.building_forget_target(self.baseSpace, positions)
-                self.troops_lost += 1
-            self.damage_troops += damage
-            return
-
-        self.find_troop_in_range(positions)
+    # Methods concerning buildings
 
     def update_buildings(self):
-        buildingTypeMask = np.bitwise_and(
-            self.baseSpace[:, :, Base.GRID_MAPPING["building_type"]],
-            self.baseSpace[:, :, Base.GRID_MAPPING["building_remaining_hp"]] > 0
-        )
-        done_building = set()
-        for y, x in np.argwhere(buildingTypeMask):
-            if buildingTypeMask[y, x] == BaseBuilding.TYPE_DEFENSE:
-                buildingID = self.baseSpace[y, x, Base.GRID_MAPPING["buildingID"]]
-                if buildingID not in done_building:
-                    self.update_defense_buildings(buildingID)
-                    done_building.add(buildingID)
+        ### Buildings Update
+        #   - Every standing defense keeps or acquires a target and shoots in one vectorized pass
+        self.engine.update_defenses()
@@ -0,0 +1,212 @@
+from GameObject.warbase import Base
+from GameObject.deck import Deck
+from GameObject.warzone import Warzone
+from GameObject.observation import ObservationWriter
+from GameObject.field_store import field_cache_dir
+from coc_env import WarzoneEnv, build_episode_template, build_observation_space, build_writer_observation_space, build_action_space, build_tile_mask, build_deck_mask
+
+import numpy as np
+from gymnasium.vector import VectorEnv, AutoresetMode
+from gymnasium.vector.utils import batch_space
+
+
+class WarzoneBatchEnv(VectorEnv):
+    """
+    N attacks on the same base and deck stored as stacked arrays.
+
+    The base, troop and deck spaces of every instance live in single
+    (N, 45, 45, 15), (N, camp capacity, 15) and (N, 8, 10) arrays, and each Warzone
+    works on its own slice of them. Observations are copied out of the stacked
+    arrays in one batched write per array into double buffers, so no
+    per-instance dict is built, and finished instances are restored from the
+    template in one bulk copy. Each instance still deploys and ticks through
+    its own Warzone, so the instances play out exactly like WarzoneEnv.
+
+    The simulation options of WarzoneEnv are forwarded to every Warzone. Macro
+    steps and the split, feature and raster observations are not batched, and
+    asking for them raises a ValueError.
+    """
+
+    metadata = {"autoreset_mode": AutoresetMode.SAME_STEP}
+
+    def __init__(
+            self,
+            num_envs: int = 1,
+            townHallLevel=1,
+            base: Base = None,
+            deck: Deck = None,
+            is_rendering: bool = False,
+            macro_step: bool = False,
+            decision_events: tuple = (WarzoneEnv.EVENT_BUILDING_DESTROYED, WarzoneEnv.EVENT_TROOP_DIED, WarzoneEnv.EVENT_TICKS),
+            decision_ticks: int = 20,
+            pathfinder: str = Warzone.PATHFINDER_ASTAR,
+            replan_mode: str = Warzone.REPLAN_FULL,
+            path_cache_size: int = 0,
+            base_path: str = None,
+            compartments: bool = False,
+            path_budget: int = 0,
+            path_wait: str = Warzone.PATH_WAIT_HOLD,
+            compact_obs: bool = False,
+            split_obs: bool = False,
+            base_features: bool = False,
+            troop_raster: bool = False,
+            legacy_troop_rows: bool = False
+        ):
+        # Batched attacks are headless, `is_rendering` is accepted for parity with the registered kwargs,
+        # and so are the decision points, which only configure macro steps
+        assert base is not None
+        assert deck is not None
+
+        unsupported = {
+            "macro_step": macro_step,
+            "split_obs": split_obs,
+            "base_features": base_features,
+            "troop_raster": troop_raster
+        }
+        requested = [name for name, value in unsupported.items() if value]
+        if requested:
+            raise ValueError(f"WarzoneBatchEnv does not support {', '.join(requested)}, use WarzoneEnv instances instead")
+
+        self.num_envs = num_envs
+        self.base = base
+        self.deck = deck
+        self.townHallLevel = townHallLevel
+        self.pathfinder = pathfinder
+        self.replan_mode = replan_mode
+        self.path_cache_size = path_cache_size
+        # Saved base file, its precomputed flow fields are kept next to it
+        self.base_path = base_path
+        self.compartments = compartments
+        self.path_budget = path_budget
+        self.path_wait = path_wait
+        self.compact_obs = compact_obs
+        self.legacy_troop_rows = legacy_troop_rows
+
+        self.build_template()
+
+        if self.compact_obs:
+            writer = ObservationWriter(self.template, compact=True)
+            self.single_observation_space = build_writer_observation_space(writer, writer.dynamic_keys)
+        else:
+            self.single_observation_space = build_observation_space(self.template)
+        self.single_action_space = build_action_space(self.template)
+        self.observation_space = batch_space(self.single_observation_space, self.num_envs)
+        self.action_space = batch_space(self.single_action_space, self.num_envs)
+
+    def action_masks(self) -> np.ndarray:
+        """ (N, H + W + K) flat action masks of every instance, laid out like `WarzoneEnv.action_masks` """
+        _height, _width, _slots = self.single_action_space.nvec
+        tiles = build_tile_mask(self.template)
+        masks = np.empty((self.num_envs, _height + _width + _slots), dtype=bool)
+        masks[:, :_height] = tiles.any(axis=1)
+        masks[:, _height:_height + _width] = tiles.any(axis=0)
+        masks[:, _height + _width:] = build_deck_mask(self.deckSpace, _slots)
+        return masks
+
+    def get_template_key(self):
+        return (id(self.base), self.base.version, id(self.deck), self.deck.version)
+
+    def build_template(self):
+        """ Allocate the stacked arrays and bind one warzone to each slice """
+        self.template = build_episode_template(self.base, self.deck, Deck.LEGACY_TROOP_ROWS if self.legacy_troop_rows else None)
+        self.template_key = self.get_template_key()
+
+        N = self.num_envs
+        baseTemplate = self.template["base"]
+        troopTemplate = self.template["troops"]
+        deckTemplate = self.template["deck"]
+
+        self.baseSpace = np.empty((N,) + baseTemplate.shape, dtype=baseTemplate.dtype)
+        # Allocated field-major and exposed transposed, so every instance keeps contiguous troop columns
+        rows, fields = troopTemplate.shape
+        self.troopSpace = np.empty((N, fields, rows), dtype=troopTemplate.dtype).transpose(0, 2, 1)
+        self.deckSpace = np.empty((N,) + deckTemplate.shape, dtype=deckTemplate.dtype)
+
+        self.baseSpace[:] = baseTemplate
+        self.troopSpace[:] = troopTemplate
+        self.deckSpace[:] = deckTemplate
+
+        self.warzones = [
+            Warzone(
+                baseSpace=self.baseSpace[i],
+                troopSpace=self.troopSpace[i],
+                deckSpace=self.deckSpace[i],
+                pathfinder=self.pathfinder,
+                replan_mode=self.replan_mode,
+                path_cache_size=self.path_cache_size,
+                field_cache_dir=field_cache_dir(self.base_path) if self.base_path and self.pathfinder == Warzone.PATHFINDER_FLOW_FIELD else None,
+                compartments=self.compartments,
+                path_budget=self.path_budget,
+                path_wait=self.path_wait
+            ) for i in range(N)
+        ]
+        self.writer = ObservationWriter(self.template, batchShape=(N,), compact=self.compact_obs)
+
+    def restore_template(self, envIDs: np.ndarray):
+        """ Restore the pristine template into the given instances with one bulk copy per array """
+        self.baseSpace[envIDs] = self.template["base"]
+        self.troopSpace[envIDs] = self.template["troops"]
+        self.deckSpace[envIDs] = self.template["deck"]
+        for envID in envIDs:
+            self.warzones[envID].reset()
+
+    def get_observation(self, into: dict = None) -> dict:
+        """ Copy of the stacked arrays, compact with `compact_obs`, written into the idle buffers or `into` """
+        observation = {
+            "base": self.baseSpace,
+            "troops": self.troopSpace,
+            "deck": self.deckSpace
+        }
+        return self.writer.write(observation, self.writer.dynamic_keys, into)
+
+    def reset(self, seed=None, options=None):
+        """ Resets every instance for a new episode. """
+        super().reset(seed=seed)
+
+        if self.template_key != self.get_template_key():
+            self.build_template()
+        else:
+            self.restore_template(np.arange(self.num_envs))
+
+        return self.get_observation(), {}
+
+    def deploy_troops(self, actions: np.ndarray) -> np.ndarray:
+        """ Deploy the action of every instance through its warzone, returns which were valid """
+        return np.array([
+            warzone.deploy_troop(deckID, position=(y, x))
+            for warzone, (y, x, deckID) in zip(self.warzones, actions.tolist())
+        ], dtype=bool)
+
+    def step(self, actions):
+        """
+        Executes one step in every instance.
+        `actions` is an (N, 3) array of (y, x, troop_category)
+        """
+        actions = np.asarray(actions, dtype=int).reshape(self.num_envs, 3)
+        valid = self.deploy_troops(actions)
+
+        rewards = np.zeros(self.num_envs, dtype=np.float64)
+        terminations = np.zeros(self.num_envs, dtype=bool)
+        for envID, warzone in enumerate(self.warzones):
+            warzone.update()
+            rewards[envID] = warzone.get_reward()
+            terminations[envID] = warzone.did_end()
+            warzone.sync_base_space()
+
+        truncations = np.zeros(self.num_envs, dtype=bool)
+        infos = {"invalid_action": ~valid, "_invalid_action": np.ones(self.num_envs, dtype=bool)}
+
+        observation = self.get_observation()
+        doneIDs = np.nonzero(terminations)[0]
+        if len(doneIDs):
+            final_obs = np.full(self.num_envs, None, dtype=object)
+            for envID in doneIDs:
+                final_obs[envID] = {key: array[envID].copy() for key, array in observation.items()}
+            infos["final_obs"] = final_obs
+            infos["_final_obs"] = terminations.copy()
+            infos["final_info"] = {}
+            self.restore_template(doneIDs)
+            # The restored instances start their next episode in the same observation
+            observation = self.get_observation(observation)
+
+        return observation, rewards, terminations, truncations, infos
@@ -3,14 +3,91 @@ from typing import List, Tuple
 from GameObject.warbase import Base
 from GameObject.deck import Deck
 from GameObject.warzone import Warzone
+from GameObject.field_store import field_cache_dir
+from GameObject.observation import ObservationWriter
 from renderer import WarzoneRenderer
 
 import gymnasium as gym
 from gymnasium import spaces
 import numpy as np
 
+def build_episode_template(base: Base, deck: Deck, troopRows: int = None) -> dict:
+    """ Pristine base, troop and deck arrays every episode on this (base, deck) pair starts from """
+    return {
+        "base": base.getStateSpace(),
+        "troops": np.asfortranarray(deck.getUnplacedTroopSpace(troopRows)),
+        "deck": deck.getStateSpace()
+    }
+
+
+def build_observation_space(template: dict) -> spaces.Dict:
+    """ Observation space (Base + Deck + Troops) of a single warzone """
+    return spaces.Dict({
+        "base": spaces.Box(low=-1, high=10000, shape=template["base"].shape, dtype=np.int32),
+        "troops": spaces.Box(low=-1, high=1000, shape=template["troops"].shape, dtype=np.int32),
+        "deck": spaces.Box(low=0, high=1000, shape=template["deck"].shape, dtype=np.int32),
+    })
+
+
+def build_writer_observation_space(writer: ObservationWriter, keys: List[str]) -> spaces.Dict:
+    """ Observation space of the writer arrays `keys`, one Box each with per-channel bounds """
+    boxes = {}
+    for key in keys:
+        shape = writer.shape(key)
+        low, high = writer.bounds(key, shape)
+        boxes[key] = spaces.Box(low=low, high=high, shape=shape, dtype=low.dtype)
+    return spaces.Dict(boxes)
+
+
+def build_action_space(template: dict) -> spaces.MultiDiscrete:
+    """ Action space (Deploy troops at (y, x) from a category) of a single warzone """
+    _height, _width, _ = template["base"].shape
+    return spaces.MultiDiscrete([_height, _width, len(Deck.get_deck_member_ids(template["deck"])) + 1])
+
+
+def build_tile_mask(template: dict) -> np.ndarray:
+    """ Tiles a troop can be deployed on, every empty tile of the base """
+    return template["base"][:, :, Base.GRID_MAPPING["building_type"]] == BaseBuilding.TYPE_EMPTY
+
+
+def build_deck_mask(deckSpace: np.ndarray, size: int) -> np.ndarray:
+    """ Deck slots that can still deploy a troop, the SkipMove slot is always allowed """
+    counts = deckSpace[..., Deck.DECK_MAPPING["count"]]
+    mask = np.zeros(counts.shape[:-1] + (size,), dtype=bool)
+    mask[..., :counts.shape[-1]] = counts > 0
+    mask[..., Deck.DECK_NAME_MAPS_ID["SkipMove"]] = True
+    return mask
+
+
 class WarzoneEnv(gym.Env):
-    def __init__(self, townHallLevel=1, base: Base = None, deck: Deck = None, is_rendering: bool = True):
+
+    # Decision events that hand control back to the policy in macro step mode
+    EVENT_BUILDING_DESTROYED = "building_destroyed"
+    EVENT_TROOP_DIED = "troop_died"
+    EVENT_TICKS = "ticks"
+
+    def __init__(
+            self,
+            townHallLevel=1,
+            base: Base = None,
+            deck: Deck = None,
+            is_rendering: bool = True,
+            macro_step: bool = False,
+            decision_events: Tuple[str, ...] = (EVENT_BUILDING_DESTROYED, EVENT_TROOP_DIED, EVENT_TICKS),
+            decision_ticks: int = 20,
+            pathfinder: str = Warzone.PATHFINDER_ASTAR,
+            replan_mode: str = Warzone.REPLAN_FULL,
+            path_cache_size: int = 0,
+            base_path: str = None,
+            compartments: bool = False,
+            path_budget: int = 0,
+            path_wait: str = Warzone.PATH_WAIT_HOLD,
+            compact_obs: bool = False,
+            split_obs: bool = False,
+            base_features: bool = False,
+            troop_raster: bool = False,
+            legacy_troop_rows: bool = False
+        ):
         super(WarzoneEnv, self).__init__()
         
         assert base is not None
@@ -21,25 +98,46 @@ class WarzoneEnv(gym.Env):
 
         self.townHallLevel = townHallLevel
 
+        # Macro step: one `step` deploys and then simulates until the next decision point
+        self.macro_step = macro_step
+        self.decision_events = set(decision_events)
+        self.decision_ticks = decision_ticks
+        self.pathfinder = pathfinder
+        self.replan_mode = replan_mode
+        self.path_cache_size = path_cache_size
+        # Saved base file, its precomputed flow fields are kept next to it
+        self.base_path = base_path
+        self.compartments = compartments
+        self.path_budget = path_budget
+        self.path_wait = path_wait
+        # Observe every channel in the narrowest dtype holding it instead of the int64 state spaces
+        self.compact_obs = compact_obs
+        # Send the static base channels once per episode in the reset info, steps only observe the dynamic ones
+        self.split_obs = split_obs
+        # Observe derived per-tile channels of the base: defense coverage, DPS, nearest building distance, compartment
+        self.base_features = base_features
+        # Observe the troops alive as per-tile counts and HP, ground and flying apart, aligned with the base grid
+        self.troop_raster = troop_raster
+        # Observe the 135-row troop space of every town hall level, the layout models trained before per-camp sizing expect
+        self.legacy_troop_rows = legacy_troop_rows
+
         self.is_rendering = is_rendering
         self.renderer = WarzoneRenderer() if self.is_rendering else None
 
-        self.warzone = Warzone(
-            baseSpace=self.base.getStateSpace(),
-            troopSpace=self.deck.getUnplacedTroopSpace(),
-            deckSpace=self.deck.getStateSpace()
-        )
-
-        # Define observation space (Base + Deck + Troops)
-        self.observation_space = spaces.Dict({
-            "base": spaces.Box(low=-1, high=10000, shape=self.warzone.baseSpace.shape, dtype=np.int32),
-            "troops": spaces.Box(low=-1, high=1000, shape=self.warzone.troopSpace.shape, dtype=np.int32),
-            "deck": spaces.Box(low=0, high=1000, shape=self.warzone.deckSpace.shape, dtype=np.int32),
-        })
+        self.template = None
+        self.template_key = None
+        self.warzone = None
+        self.writer = None
+        self.build_template()
 
-        # Define action space (Deploy troops at (y, x) from a category)
-        _height, _width, _ = self.warzone.baseSpace.shape
-        self.action_space = spaces.MultiDiscrete([_height, _width, len(self.deck.get_deck_member_ids(self.warzone.deckSpace)) + 1])
+        if self.compact_obs or self.split_obs or self.base_features or self.troop_raster:
+            self.observation_space = build_writer_observation_space(self.writer, self.writer.dynamic_keys)
+            self.static_observation_space = build_writer_observation_space(self.writer, self.writer.static_keys)
+        else:
+            self.observation_space = build_observation_space(self.template)
+        self.action_space = build_action_space(self.template)
+        # The masks exist before the first reset, a fresh env can be stepped right away
+        self.reset_action_mask()
         
         self.total_reward = 0
 
@@ -54,24 +152,63 @@ class WarzoneEnv(gym.Env):
         self.is_rendering = False
         
  
+    def get_template_key(self):
+        return (id(self.base), self.base.version, id(self.deck), self.deck.version)
+
+    def build_template(self):
+        """
+        Rasterize the base and deck once into a pristine episode template.
+        The warzone owns preallocated copies that every reset restores in place.
+        """
+        self.template = build_episode_template(self.base, self.deck, Deck.LEGACY_TROOP_ROWS if self.legacy_troop_rows else None)
+        self.template_key = self.get_template_key()
+        self.warzone = Warzone(
+            baseSpace=self.template["base"].copy(),
+            troopSpace=self.template["troops"].copy(order="F"),
+            deckSpace=self.template["deck"].copy(),
+            pathfinder=self.pathfinder,
+            replan_mode=self.replan_mode,
+            path_cache_size=self.path_cache_size,
+            field_cache_dir=field_cache_dir(self.base_path) if self.base_path and self.pathfinder == Warzone.PATHFINDER_FLOW_FIELD else None,
+            compartments=self.compartments,
+            path_budget=self.path_budget,
+            path_wait=self.path_wait,
+            base_features=self.base_features,
+            troop_raster=self.troop_raster
+        )
+        # Features of the intact base, computed once per template
+        if self.base_features:
+            self.template["features"] = self.warzone.features.initial_space
+        # No troop is deployed when an episode starts
+        if self.troop_raster:
+            self.template["troop_density"] = np.zeros_like(self.warzone.troop_raster.space)
+        # Observations are copies, double buffered, and never the warzone arrays themselves
+        self.writer = ObservationWriter(self.template, compact=self.compact_obs, split=self.split_obs)
+
+    def restore_template(self):
+        """ Restore the pristine template into the warzone arrays, rebuilding it if the base or deck was edited """
+        if self.template_key != self.get_template_key():
+            self.build_template()
+            return
+
+        np.copyto(self.warzone.baseSpace, self.template["base"])
+        np.copyto(self.warzone.troopSpace, self.template["troops"])
+        np.copyto(self.warzone.deckSpace, self.template["deck"])
+        self.warzone.reset()
+
     def reset(self, seed=None, options=None):
         """ Resets the environment for a new episode. """
         super().reset(seed=seed)
-        
-        self.warzone = Warzone(
-            baseSpace=self.base.getStateSpace(),
-            troopSpace=self.deck.getUnplacedTroopSpace(),
-            deckSpace=self.deck.getStateSpace()
-        )
+
+        self.restore_template()
+        self.reset_action_mask()
 
         self.total_reward = 0
         self.steps = 0
 
-        return {
-            "base": self.warzone.baseSpace,
-            "troops": self.warzone.troopSpace,
-            "deck": self.warzone.deckSpace
-        }, {}
+        if self.split_obs:
+            return self.get_observation(), {"static": self.writer.write(self.get_state_spaces(), self.writer.static_keys)}
+        return self.get_observation(), {}
 
     def step(self, action):
         """
@@ -79,17 +216,53 @@ class WarzoneEnv(gym.Env):
         `action` is a tuple (y, x, troop_category)
         """
         y, x, deckID = action
-        self.warzone.deploy_troop(deckID, position=(y, x))
-        self.warzone.update()
+        valid = self.warzone.deploy_troop(deckID, position=(y, x))
+        self.update_action_mask(deckID)
+
+        # In macro step mode the reward of every simulated tick is accumulated
+        reward = 0
+        ticks = 0
+        while True:
+            self.warzone.update()
+            reward += self.compute_reward()
+            ticks += 1
+            done = self.is_done()
+            if done or not self.macro_step or self.reached_decision_point(ticks):
+                break
 
-        reward = self.compute_reward()
-        done = self.is_done()
+        self.warzone.sync_base_space()
 
-        return {
+        return self.get_observation(), reward, done, False, {"ticks": ticks, "invalid_action": not valid}
+
+    def get_state_spaces(self) -> dict:
+        stateSpaces = {
             "base": self.warzone.baseSpace,
             "troops": self.warzone.troopSpace,
             "deck": self.warzone.deckSpace
-        }, reward, done, False, {}
+        }
+        if self.base_features:
+            stateSpaces["features"] = self.warzone.features.space
+        if self.troop_raster:
+            stateSpaces["troop_density"] = self.warzone.troop_raster.space
+        return stateSpaces
+
+    def get_observation(self) -> dict:
+        """ Snapshot of the arrays that change during the episode, valid until the step after next """
+        return self.writer.write(self.get_state_spaces(), self.writer.dynamic_keys)
+
+    def reached_decision_point(self, ticks: int) -> bool:
+        """ Whether the policy has to act again after `ticks` simulated ticks of a macro step """
+        # Nothing left to deploy, the rest of the battle needs no decision
+        if not np.any(self.warzone.deckSpace[:, Deck.DECK_MAPPING["count"]] > 0):
+            return False
+
+        if self.EVENT_BUILDING_DESTROYED in self.decision_events and self.warzone.destroyed_building_count_increment_in_move:
+            return True
+        if self.EVENT_TROOP_DIED in self.decision_events and self.warzone.troops_lost_in_move:
+            return True
+        if self.EVENT_TICKS in self.decision_events and ticks >= self.decision_ticks:
+            return True
+        return False
     
     def compute_reward(self):
         """ Computes reward based on damage dealt and buildings destroyed. """
@@ -99,19 +272,51 @@ class WarzoneEnv(gym.Env):
         """ Checks if the episode is over (all troops deployed or all buildings destroyed). """
         return self.warzone.did_end()
     
-    def get_valid_actions(self):
+    def reset_action_mask(self):
+        """
+        Rebuild the flat action mask of the MultiDiscrete([H, W, K]) space.
+        It is laid out as [y mask | x mask | deck mask] with views on each part
+        """
+        _height, _width, _slots = self.action_space.nvec
+        self.tile_mask = build_tile_mask(self.template)
+        self.action_mask = np.zeros(_height + _width + _slots, dtype=bool)
+        self.y_mask = self.action_mask[:_height]
+        self.x_mask = self.action_mask[_height:_height + _width]
+        self.deck_mask = self.action_mask[_height + _width:]
+
+        # Building footprints never change during a battle, so the tile part is fixed per template
+        self.y_mask[:] = self.tile_mask.any(axis=1)
+        self.x_mask[:] = self.tile_mask.any(axis=0)
+        self.deck_mask[:] = build_deck_mask(self.warzone.deckSpace, _slots)
+
+    def update_action_mask(self, deckID: int):
+        """ Only the slot that was just deployed from can change its availability """
+        if 0 <= deckID < self.warzone.deckSpace.shape[0] and deckID != Deck.DECK_NAME_MAPS_ID["SkipMove"]:
+            self.deck_mask[deckID] = Deck.get_deck_member_count(self.warzone.deckSpace, deckID) > 0
+
+    def action_masks(self) -> np.ndarray:
         """
-        Returns a list of valid (y, x, troop_category) actions.
+        Flat boolean mask over every action dimension, as expected by masked PPO sampling.
+        The y and x parts are marginals of the tile mask: each allows a row or column with at least
+        one deployable tile, so a sampled (y, x) pair can still name an occupied tile
+        """
+        return self.action_mask.copy()
+
+    def get_action_mask(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """ Per-dimension masks (y, x, deck slot), the y and x masks are marginals of the tile mask """
+        return self.y_mask, self.x_mask, self.deck_mask
+
+    def get_valid_actions(self) -> np.ndarray:
+        """
+        Returns an array of valid (y, x, troop_category) actions.
         This ensures we don't select an already deployed troop or invalid position.
         """
-        valid_actions = []
-        for deckID in range(len(self.deck.get_deck_member_ids(self.warzone.deckSpace))):
-            if not self.warzone.is_troop_deployed(deckID):
-                for y in range(45):
-                    for x in range(45):
-                        if self.warzone.is_valid_deployment(y, x):
-                            valid_actions.append((y, x, deckID))
-        return valid_actions
+        tiles = np.argwhere(self.tile_mask)
+        deckIDs = np.nonzero(self.deck_mask)[0]
+        return np.concatenate([
+            np.repeat(tiles, len(deckIDs), axis=0),
+            np.tile(deckIDs, len(tiles))[:, None]
+        ], axis=1)
     
     def render(self, mode='human'):
         """ Renders the environment. """
@@ -132,6 +337,44 @@ class WarzoneEnv(gym.Env):
             )
 
 
+class ReassembledObservation(gym.ObservationWrapper):
+    """
+    Whole observation of a `split_obs` warzone env.
+
+    The static arrays of the reset info are merged once per episode, and the
+    dynamic arrays of every step on top of them, into the arrays the env
+    observes without `split_obs`, for policies that need the whole base.
+    """
+
+    def __init__(self, env: gym.Env):
+        super().__init__(env)
+        warzoneEnv = env.unwrapped
+        assert warzoneEnv.split_obs
+
+        # Double buffered like the env observations, the static channels are merged into both copies
+        self.whole = ObservationWriter(warzoneEnv.template, compact=warzoneEnv.compact_obs)
+        staticKeys = set(warzoneEnv.writer.static_keys)
+        plan = self.whole.reassembly_plan(warzoneEnv.writer)
+        self.static_plan = [move for move in plan if move[2] in staticKeys]
+        self.dynamic_plan = [move for move in plan if move[2] not in staticKeys]
+        self.observation_space = build_writer_observation_space(self.whole, self.whole.dynamic_keys)
+
+    def reset(self, *, seed=None, options=None):
+        observation, info = self.env.reset(seed=seed, options=options)
+        for buffers in zip(*self.whole.buffers.values()):
+            self.merge(dict(zip(self.whole.buffers, buffers)), info["static"], self.static_plan)
+        return self.observation(observation), info
+
+    def observation(self, observation: dict) -> dict:
+        whole = {key: self.whole.next_buffer(key) for key in self.whole.dynamic_keys}
+        self.merge(whole, observation, self.dynamic_plan)
+        return whole
+
+    def merge(self, whole: dict, arrays: dict, plan: list):
+        for key, index, sourceKey, sourceIndex in plan:
+            whole[key][..., index] = arrays[sourceKey][..., sourceIndex]
+
+
 if __name__ == "__main__":
 
     th = 5
@@ -18,7 +18,7 @@ with open(deck_filename, "rb") as f:
     deck = pickle.load(f)
 
 
-env = WarzoneEnv(townHallLevel=townhall_level, base=base, deck=deck, is_rendering=False)
+env = WarzoneEnv(townHallLevel=townhall_level, base=base, deck=deck, is_rendering=False, legacy_troop_rows=True)
 # env = FlattenObservation(env)
 
 # # Train the model
@@ -4,6 +4,7 @@ from gymnasium.envs.registration import register
 register(
     id='Warzone-v0',
     entry_point='coc_env:WarzoneEnv',  # Update this!
+    vector_entry_point='coc_batch_env:WarzoneBatchEnv',
     kwargs={
         "townHallLevel": 1,
         "base": None,
@@ -0,0 +1,46 @@
+import os
+import random
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from GameObject.warbase import Base
+from GameObject.deck import Deck
+
+
+@pytest.fixture
+def make_base_deck():
+    """ Random base and deck of a town hall level, the same for a given seed """
+    def make(townHallLevel: int, seed: int = 0):
+        random.seed(seed)
+        np.random.seed(seed)
+        base = Base(townHallLevel)
+        base.fillRandomly()
+        deck = Deck(townHallLevel)
+        deck.fillRandomly()
+        return base, deck
+    return make
+
+
+@pytest.fixture
+def play():
+    """ Deploy the first troop left on the top rows now and then, skip otherwise, until the battle ends """
+    def run(env, seed: int = 0, episodes: int = 1):
+        rng = np.random.default_rng(seed)
+        total = 0
+        for _ in range(episodes):
+            env.reset(seed=seed)
+            done = False
+            while not done:
+                deployable = [i for i in range(7) if env.warzone.deckSpace[i, Deck.DECK_MAPPING["count"]] > 0]
+                if deployable and rng.random() < 0.3:
+                    action = (int(rng.integers(0, 2)), int(rng.integers(0, 45)), deployable[0])
+                else:
+                    action = (0, 0, Deck.DECK_NAME_MAPS_ID["SkipMove"])
+                _, reward, done, _, _ = env.step(action)
+                total += reward
+        return total
+    return run
@@ -0,0 +1,38 @@
+import numpy as np
+
+from coc_env import WarzoneEnv
+from GameObject.deck import Deck
+
+
+def test_step_before_reset(make_base_deck):
+    base, deck = make_base_deck(1)
+    env = WarzoneEnv(1, base, deck, is_rendering=False)
+
+    _, _, _, _, info = env.step((0, 0, 0))
+    assert info["ticks"] == 1
+    assert env.action_masks().shape == (sum(env.action_space.nvec),)
+
+
+def test_valid_actions_are_accepted(make_base_deck):
+    base, deck = make_base_deck(1)
+    env = WarzoneEnv(1, base, deck, is_rendering=False)
+    env.reset()
+
+    actions = env.get_valid_actions()
+    assert len(actions)
+    for action in actions:
+        env.reset()
+        _, _, _, _, info = env.step(tuple(action))
+        assert not info["invalid_action"], action
+
+
+def test_skip_move_on_occupied_tile(make_base_deck):
+    base, deck = make_base_deck(1)
+    env = WarzoneEnv(1, base, deck, is_rendering=False)
+    env.reset()
+
+    y, x = np.argwhere(~env.tile_mask)[0]
+    _, _, _, _, info = env.step((y, x, Deck.DECK_NAME_MAPS_ID["SkipMove"]))
+    assert not info["invalid_action"]
+    assert env.warzone.troops_deployed == 0
+    assert env.get_action_mask()[2][Deck.DECK_NAME_MAPS_ID["SkipMove"]]
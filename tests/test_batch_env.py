@@ -0,0 +1,72 @@
+import gymnasium as gym
+import numpy as np
+import pytest
+
+import register_environment
+from coc_env import WarzoneEnv
+from coc_batch_env import WarzoneBatchEnv
+from GameObject.warbase import Base
+from GameObject.deck import Deck
+from GameObject.warzone import Warzone
+
+
+def test_observations_are_copies(make_base_deck):
+    base, deck = make_base_deck(1)
+    env = WarzoneBatchEnv(2, 1, base, deck)
+    observation, _ = env.reset()
+    snapshot = {key: array.copy() for key, array in observation.items()}
+    assert not np.shares_memory(observation["base"], env.baseSpace)
+
+    actions = np.tile([0, 0, 7], (2, 1))
+    env.step(actions)
+    for key, array in observation.items():
+        np.testing.assert_array_equal(array, snapshot[key])
+
+
+def test_options_are_forwarded(make_base_deck):
+    base, deck = make_base_deck(1)
+    env = gym.make_vec(
+        "Warzone-v0", num_envs=2, vectorization_mode="vector_entry_point",
+        base=base, deck=deck, is_rendering=False,
+        pathfinder=Warzone.PATHFINDER_JPS, compartments=True, path_budget=50
+    )
+    for warzone in env.unwrapped.warzones:
+        assert warzone.pathfinder == Warzone.PATHFINDER_JPS
+        assert warzone.compartments is not None
+        assert warzone.path_budget == 50
+
+
+@pytest.mark.parametrize("option", ["macro_step", "split_obs", "base_features", "troop_raster"])
+def test_unsupported_options_raise(make_base_deck, option):
+    base, deck = make_base_deck(1)
+    with pytest.raises(ValueError, match=option):
+        WarzoneBatchEnv(2, 1, base, deck, **{option: True})
+
+
+def test_steps_match_single_envs(make_base_deck):
+    """ Every instance plays out like a WarzoneEnv given the same actions, invalid deploys included """
+    base, deck = make_base_deck(1)
+    batch = WarzoneBatchEnv(2, 1, base, deck)
+    singles = [WarzoneEnv(1, base, deck, is_rendering=False) for _ in range(2)]
+    batch.reset(seed=0)
+    for env in singles:
+        env.reset(seed=0)
+
+    y, x = np.argwhere(batch.template["base"][:, :, Base.GRID_MAPPING["building_type"]] != 0)[0]
+    skip = Deck.DECK_NAME_MAPS_ID["SkipMove"]
+    rng = np.random.default_rng(0)
+    invalid = np.zeros(2, dtype=bool)
+    for t in range(150):
+        actions = np.array([
+            (0, t % 45, 0) if t % 4 == 0 else (y, x, 0) if t % 4 == 1 else (0, 0, skip),
+            (int(rng.integers(0, 45)), int(rng.integers(0, 45)), int(rng.integers(0, 8)))
+        ])
+        _, rewards, terminations, _, infos = batch.step(actions)
+        for envID, env in enumerate(singles):
+            _, reward, done, _, info = env.step(tuple(actions[envID]))
+            assert (rewards[envID], terminations[envID]) == (reward, done)
+            assert infos["invalid_action"][envID] == info["invalid_action"]
+            if done:
+                env.reset(seed=0)
+        invalid |= infos["invalid_action"]
+    assert invalid.all() and infos["_invalid_action"].all()
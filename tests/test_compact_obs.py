@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+from coc_env import WarzoneEnv
+from GameObject.deck import Deck
+
+
+def actions(steps: int = 150):
+    """ Deploy on the top row every third step, skip otherwise """
+    for t in range(steps):
+        yield (0, t % 45, 0) if t % 3 == 0 else (0, 0, Deck.DECK_NAME_MAPS_ID["SkipMove"])
+
+
+@pytest.mark.parametrize("townHallLevel", [1, 5])
+def test_compact_values_equal_raw_channels(make_base_deck, townHallLevel):
+    base, deck = make_base_deck(townHallLevel, 0)
+    raw = WarzoneEnv(townHallLevel, base, deck, is_rendering=False)
+    compact = WarzoneEnv(townHallLevel, base, deck, is_rendering=False, compact_obs=True)
+    layout = compact.writer.layout
+
+    rawObservation, _ = raw.reset(seed=0)
+    observation, _ = compact.reset(seed=0)
+    for action in actions():
+        assert compact.observation_space.contains(observation)
+        for key, (spaceName, channels, _, _) in layout.items():
+            assert observation[key].dtype in (np.int8, np.int16, np.int32)
+            np.testing.assert_array_equal(observation[key], rawObservation[spaceName][..., channels])
+
+        rawObservation, rawReward, rawDone, _, _ = raw.step(action)
+        observation, reward, done, _, _ = compact.step(action)
+        assert (reward, done) == (rawReward, rawDone)
+        if done:
+            break
+
+    assert sum(array.nbytes for array in observation.values()) * 3 < sum(array.nbytes for array in rawObservation.values())
@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+
+from coc_env import WarzoneEnv
+from GameObject.compartments import CompartmentGraph
+from GameObject.registry import BuildingRegistry
+from GameObject.warbase import Base
+from GameObject.deck import Deck
+from GameObject.buildings import BaseBuilding
+
+
+def compartments(graph, passable):
+    """ Compartment of every tile, -1 on the standing walls """
+    result = np.full(passable.shape, -1)
+    for y, x in zip(*np.nonzero(passable)):
+        result[y, x] = graph.compartment((y, x))
+    return result
+
+
+def assert_same_partition(labels, fresh):
+    """ Both labellings split the tiles into the same groups, whatever numbers they use """
+    np.testing.assert_array_equal(labels == -1, fresh == -1)
+    pairs = set(zip(labels[fresh >= 0].tolist(), fresh[fresh >= 0].tolist()))
+    assert len(pairs) == len({label for label, _ in pairs}) == len({label for _, label in pairs})
+
+
+@pytest.mark.parametrize("townHallLevel", [3, 5])
+def test_labels_match_fresh_labelling(make_base_deck, townHallLevel):
+    base, _ = make_base_deck(townHallLevel)
+    registry = BuildingRegistry(base.getStateSpace())
+    graph = CompartmentGraph(registry)
+
+    walls = np.nonzero(registry.exists & registry.is_wall)[0]
+    assert len(walls)
+    # Knock the walls down a few at a time and merge the compartments after each batch
+    for batch in np.array_split(np.random.default_rng(0).permutation(walls), 6):
+        damage = np.zeros(registry.n_ids, dtype=registry.hp.dtype)
+        damage[batch] = registry.max_hp[batch]
+        _, _, destroyed = registry.apply_damage(damage)
+        graph.walls_destroyed(destroyed)
+
+        passable = registry.passable_mask(False)
+        assert_same_partition(compartments(graph, passable), CompartmentGraph.label(passable))
+
+    graph.reset()
+    registry.reset()
+    passable = registry.passable_mask(False)
+    assert_same_partition(compartments(graph, passable), CompartmentGraph.label(passable))
+
+
+@pytest.mark.parametrize("townHallLevel, seed", [(3, 0), (5, 0)])
+def test_compartments_keep_outcomes(make_base_deck, play, townHallLevel, seed):
+    base, deck = make_base_deck(townHallLevel, seed)
+    default = WarzoneEnv(townHallLevel, base, deck, is_rendering=False)
+    walled = WarzoneEnv(townHallLevel, base, deck, is_rendering=False, compartments=True)
+    assert play(walled, seed) == play(default, seed)
+
+
+def walled_town_hall(townHallLevel: int = 3):
+    """ Town hall at (20, 20) inside a ring of walls two tiles around it, and a deck of wall breakers and barbarians """
+    base = Base(townHallLevel)
+    assert base.placeBuilding(base.getBuildingObject("TownHall"), 20, 20)
+    ring = {(y, x) for y in range(18, 26) for x in range(18, 26)} - {(y, x) for y in range(19, 25) for x in range(19, 25)}
+    for y, x in sorted(ring):
+        assert base.placeBuilding(base.getBuildingObject("Wall"), y, x)
+    deck = Deck(townHallLevel)
+    for name in ("Wall Breaker", "Barbarian"):
+        assert deck.recruitTroop(name)
+    return base, deck
+
+
+def test_wall_ring_is_broken_through():
+    base, deck = walled_town_hall()
+    env = WarzoneEnv(3, base, deck, is_rendering=False, compartments=True)
+    env.reset(seed=0)
+    warzone = env.warzone
+    registry = warzone.registry
+    graph = warzone.compartments
+    townHallID = int(np.nonzero(registry.exists & (registry.building_type == BaseBuilding.TYPE_TOWNHALL))[0][0])
+    ringIDs = set(np.nonzero(registry.exists & registry.is_wall)[0].tolist())
+    assert len(ringIDs) == 28
+
+    assert not graph.reachable((10, 21), townHallID)
+    assert graph.reachable((19, 19), townHallID)
+    assert graph.wall_to_break((10, 21), townHallID) in ringIDs
+    assert graph.wall_to_break((19, 19), townHallID) == -1
+    assert graph.separating_walls((10, 21)) == sorted(ringIDs)
+
+    # The wall breaker goes for the ring wall nearest to it
+    env.step((10, 21, Deck.DECK_NAME_MAPS_ID["Wall Breaker"]))
+    wallID = Deck.get_troop_target_building(warzone.troopSpace, 0)
+    assert wallID in ringIDs
+    assert [(int(y), int(x)) for y, x in zip(*registry.location(wallID))] == [(18, 21)]
+
+    # The barbarian, after the town hall, has to break a ring wall too
+    env.step((30, 40, Deck.DECK_NAME_MAPS_ID["Barbarian"]))
+    assert Deck.get_troop_target_building(warzone.troopSpace, 1) in ringIDs
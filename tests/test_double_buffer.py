@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from coc_env import WarzoneEnv, ReassembledObservation
+from GameObject.deck import Deck
+
+
+def snapshot(observation: dict) -> dict:
+    return {key: array.copy() for key, array in observation.items()}
+
+
+def assert_equal(observation: dict, expected: dict):
+    assert observation.keys() == expected.keys()
+    for key in observation:
+        np.testing.assert_array_equal(observation[key], expected[key])
+
+
+@pytest.mark.parametrize("options", [{}, {"compact_obs": True}, {"split_obs": True}, {"split_obs": True, "compact_obs": True}])
+def test_previous_observation_survives_step(make_base_deck, options):
+    base, deck = make_base_deck(3, 0)
+    env = WarzoneEnv(3, base, deck, is_rendering=False, **options)
+    previous, _ = env.reset(seed=0)
+    assert not any(np.shares_memory(array, env.warzone.baseSpace) for array in previous.values())
+
+    kept = snapshot(previous)
+    for t in range(60):
+        action = (0, t % 45, 0) if t % 3 == 0 else (0, 0, Deck.DECK_NAME_MAPS_ID["SkipMove"])
+        observation, _, done, _, _ = env.step(action)
+        assert all(observation[key] is not previous[key] for key in observation)
+        # The transition (previous, observation) is intact after the write
+        assert_equal(previous, kept)
+        previous, kept = observation, snapshot(observation)
+        if done:
+            break
+
+
+def test_static_observation_survives_reset(make_base_deck):
+    base, deck = make_base_deck(3, 0)
+    env = WarzoneEnv(3, base, deck, is_rendering=False, split_obs=True)
+    _, info = env.reset(seed=0)
+    kept = snapshot(info["static"])
+    _, nextInfo = env.reset(seed=0)
+    assert all(nextInfo["static"][key] is not info["static"][key] for key in kept)
+    assert_equal(info["static"], kept)
+
+
+def test_reassembled_observation_is_double_buffered(make_base_deck):
+    base, deck = make_base_deck(3, 0)
+    env = ReassembledObservation(WarzoneEnv(3, base, deck, is_rendering=False, split_obs=True))
+    previous, _ = env.reset(seed=0)
+    kept = snapshot(previous)
+    observation, _, _, _, _ = env.step((0, 0, 0))
+    assert all(observation[key] is not previous[key] for key in observation)
+    assert_equal(previous, kept)
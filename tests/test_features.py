@@ -0,0 +1,57 @@
+import numpy as np
+
+from coc_env import WarzoneEnv
+from GameObject.deck import Deck
+from GameObject.features import BaseFeatures
+from GameObject.config import BASE_WIDTH, SCALE_FACTOR
+
+
+def recount_coverage(registry) -> tuple:
+    """ Ground and air coverage counts over the standing defenses, one defense at a time """
+    ground = np.zeros((BASE_WIDTH, BASE_WIDTH), dtype=int)
+    air = np.zeros((BASE_WIDTH, BASE_WIDTH), dtype=int)
+    ys, xs = np.indices((BASE_WIDTH, BASE_WIDTH))
+    for defenseID in registry.def_ids:
+        if registry.hp[defenseID] <= 0:
+            continue
+        distance = np.sqrt((ys - registry.centroid_y[defenseID]) ** 2 + (xs - registry.centroid_x[defenseID]) ** 2)
+        covered = (registry.min_range[defenseID] / SCALE_FACTOR <= distance) & (distance <= registry.max_range[defenseID] / SCALE_FACTOR)
+        domain = registry.target_domain[defenseID]
+        ground += covered & (domain in (1, 3))
+        air += covered & (domain in (2, 3))
+    return ground, air
+
+
+def test_features_follow_destroyed_defenses(make_base_deck):
+    base, deck = make_base_deck(3, 0)
+    env = WarzoneEnv(3, base, deck, is_rendering=False, base_features=True)
+    observation, _ = env.reset(seed=0)
+    registry = env.warzone.registry
+    M = BaseFeatures.MAPPING
+    initial = observation["features"].copy()
+
+    # Brute force distance to the nearest building tile
+    buildingTiles = np.argwhere(registry.owner_grid != registry.n_ids - 1)
+    for y, x in [(0, 0), (22, 22), (44, 10), (30, 40)]:
+        nearest = np.sqrt(((buildingTiles - (y, x)) ** 2).sum(axis=1)).min()
+        assert initial[y, x, M["nearest_building_distance"]] == int(nearest * SCALE_FACTOR)
+
+    standing = len(registry.def_ids)
+    done = False
+    t = 0
+    while not done:
+        # Deploy the whole deck along the top row, then watch
+        deployable = np.nonzero(env.warzone.deckSpace[:7, Deck.DECK_MAPPING["count"]] > 0)[0]
+        action = (0, t * 7 % 45, int(deployable[0])) if len(deployable) else (0, 0, Deck.DECK_NAME_MAPS_ID["SkipMove"])
+        observation, _, done, _, _ = env.step(action)
+        t += 1
+        ground, air = recount_coverage(registry)
+        np.testing.assert_array_equal(observation["features"][..., M["ground_coverage"]], ground)
+        np.testing.assert_array_equal(observation["features"][..., M["air_coverage"]], air)
+        assert np.all(observation["features"][..., M["dps"]][(ground == 0) & (air == 0)] == 0)
+        # The layout channels never change
+        np.testing.assert_array_equal(observation["features"][..., M["compartment"]], initial[..., M["compartment"]])
+    assert np.count_nonzero(registry.hp[registry.def_ids] > 0) < standing
+
+    observation, _ = env.reset(seed=0)
+    np.testing.assert_array_equal(observation["features"], initial)
@@ -0,0 +1,47 @@
+import os
+
+import numpy as np
+import pytest
+
+from coc_env import WarzoneEnv
+from GameObject import field_store
+from GameObject.warzone import Warzone
+
+
+def base_space(make_base_deck, seed: int) -> np.ndarray:
+    base, deck = make_base_deck(3, seed)
+    return WarzoneEnv(3, base, deck, is_rendering=False).template["base"]
+
+
+def test_round_trip(make_base_deck, tmp_path, monkeypatch):
+    baseSpace = base_space(make_base_deck, 0)
+    cacheDir = str(tmp_path / "base.fields")
+
+    steps = field_store.load_ground_fields(cacheDir, baseSpace)
+    assert os.listdir(cacheDir) == [field_store.base_content_hash(baseSpace) + ".npy"]
+    assert isinstance(steps, np.memmap)
+    np.testing.assert_array_equal(steps, field_store.compute_ground_fields(baseSpace))
+
+    # A hit maps the stored file without computing anything
+    monkeypatch.setattr(field_store, "compute_ground_fields", pytest.fail)
+    np.testing.assert_array_equal(field_store.load_ground_fields(cacheDir, baseSpace), steps)
+
+
+def test_changed_base_replaces_stale_file(make_base_deck, tmp_path):
+    cacheDir = str(tmp_path / "base.fields")
+    field_store.load_ground_fields(cacheDir, base_space(make_base_deck, 0))
+
+    edited = base_space(make_base_deck, 1)
+    steps = field_store.load_ground_fields(cacheDir, edited)
+    assert os.listdir(cacheDir) == [field_store.base_content_hash(edited) + ".npy"]
+    np.testing.assert_array_equal(steps, field_store.compute_ground_fields(edited))
+
+
+def test_stored_fields_keep_outcomes(make_base_deck, play, tmp_path):
+    rewards = []
+    for basePath in (None, str(tmp_path / "base.pkl")):
+        base, deck = make_base_deck(3, 0)
+        env = WarzoneEnv(3, base, deck, is_rendering=False, pathfinder=Warzone.PATHFINDER_FLOW_FIELD, base_path=basePath)
+        rewards.append(play(env, 0))
+    assert os.path.isdir(tmp_path / "base.fields")
+    assert rewards[0] == rewards[1]
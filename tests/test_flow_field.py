@@ -0,0 +1,88 @@
+from collections import deque
+
+import numpy as np
+import pytest
+
+from GameObject.config import BASE_WIDTH
+from GameObject.flow_field import FlowFieldCache
+from GameObject.registry import BuildingRegistry
+
+
+def wavefront(registry, buildingID):
+    """ Reference 8-way breadth first search from the footprint over the passable tiles """
+    passable = registry.passable_mask(False)
+    steps = np.full((BASE_WIDTH, BASE_WIDTH), np.inf)
+    queue = deque()
+    for y, x in zip(*registry.location(buildingID)):
+        steps[y, x] = 0
+        queue.append((y, x))
+    while queue:
+        y, x = queue.popleft()
+        for dy, dx in FlowFieldCache.NEIGHBOURS:
+            ny, nx = y + dy, x + dx
+            if 0 <= ny < BASE_WIDTH and 0 <= nx < BASE_WIDTH and passable[ny, nx] and steps[ny, nx] == np.inf:
+                steps[ny, nx] = steps[y, x] + 1
+                queue.append((ny, nx))
+    return steps
+
+
+def field_steps(field):
+    """ Whole steps of a field, the tie break stays below one step """
+    return np.floor(field.distance)
+
+
+def targets(registry):
+    """ Every standing building that is not a wall """
+    return np.nonzero(registry.counted)[0]
+
+
+@pytest.mark.parametrize("townHallLevel", [3, 5])
+def test_ground_field_matches_wavefront(make_base_deck, townHallLevel):
+    base, _ = make_base_deck(townHallLevel)
+    registry = BuildingRegistry(base.getStateSpace())
+    fields = FlowFieldCache(registry)
+    for buildingID in targets(registry):
+        np.testing.assert_array_equal(field_steps(fields.get(buildingID, False)), wavefront(registry, buildingID))
+
+
+@pytest.mark.parametrize("townHallLevel", [3, 5])
+def test_follow_descends_one_step_per_tile(make_base_deck, townHallLevel):
+    base, _ = make_base_deck(townHallLevel)
+    registry = BuildingRegistry(base.getStateSpace())
+    fields = FlowFieldCache(registry)
+    passable = registry.passable_mask(False)
+    for buildingID in targets(registry):
+        field = fields.get(buildingID, False)
+        for start in [(0, 0), (0, BASE_WIDTH - 1), (BASE_WIDTH - 1, 0), (BASE_WIDTH - 1, BASE_WIDTH - 1)]:
+            if not field.reaches(start):
+                continue
+            tiles, wallID = fields.follow(buildingID, start, 1.0, False)
+            assert wallID == -1
+            previous = start
+            for tile in tiles:
+                # Every step goes to a passable neighbour one step closer, so the path is a shortest one
+                assert max(abs(tile[0] - previous[0]), abs(tile[1] - previous[1])) == 1
+                assert passable[tile]
+                assert field_steps(field)[tile] == field_steps(field)[previous] - 1
+                previous = tile
+            assert fields.in_range(buildingID, previous, 1.0)
+
+
+@pytest.mark.parametrize("townHallLevel", [3, 5])
+def test_repaired_fields_match_fresh_wavefront(make_base_deck, townHallLevel):
+    base, _ = make_base_deck(townHallLevel)
+    registry = BuildingRegistry(base.getStateSpace())
+    fields = FlowFieldCache(registry)
+    for buildingID in targets(registry):
+        fields.get(buildingID, False)
+
+    walls = np.nonzero(registry.exists & registry.is_wall)[0]
+    assert len(walls)
+    # Knock the walls down a few at a time, repairing the fields after each batch
+    for batch in np.array_split(np.random.default_rng(0).permutation(walls), 4):
+        damage = np.zeros(registry.n_ids, dtype=registry.hp.dtype)
+        damage[batch] = registry.max_hp[batch]
+        _, _, destroyed = registry.apply_damage(damage)
+        fields.repair(destroyed)
+        for buildingID in targets(registry):
+            np.testing.assert_array_equal(field_steps(fields.get(buildingID, False)), wavefront(registry, buildingID))
@@ -0,0 +1,64 @@
+import numpy as np
+
+from coc_env import WarzoneEnv
+from GameObject.jump_point import JumpPointSearch
+from GameObject.path_buffer import PathBuffer
+from GameObject.warzone import Warzone
+
+
+def assert_walk(start, tiles):
+    """ Every tile is one king move away from the one before it """
+    previous = start
+    for tile in tiles:
+        assert max(abs(tile[0] - previous[0]), abs(tile[1] - previous[1])) == 1
+        previous = tile
+
+
+def test_open_grid_path_is_shortest():
+    passable = np.ones((45, 45), dtype=bool)
+    search = JumpPointSearch(passable, (20, 30), 1.0)
+    tiles, barrier = search.search((0, 0))
+
+    assert barrier is None
+    assert_walk((0, 0), tiles)
+    assert (tiles[-1][0] - 20) ** 2 + (tiles[-1][1] - 30) ** 2 <= 1
+    # 20 diagonal and 9 straight steps reach (20, 29)
+    assert len(tiles) == 29
+    # Only jump points are expanded, not every tile of the way
+    assert search.expanded < len(tiles)
+
+
+def test_enclosed_goal_falls_back_to_barrier():
+    passable = np.ones((45, 45), dtype=bool)
+    passable[18:23, 18:23] = False
+    passable[19:22, 19:22] = True
+    search = JumpPointSearch(passable, (20, 20), 0.5)
+    tiles, barrier = search.search((5, 5))
+
+    assert barrier is not None and not passable[barrier]
+    assert_walk((5, 5), tiles)
+    assert all(passable[tile] for tile in tiles)
+    assert max(abs(tiles[-1][0] - barrier[0]), abs(tiles[-1][1] - barrier[1])) == 1
+
+    # The warzone expands the waypoints straight into the path buffer
+    steps = search.search_steps((5, 5))
+    while True:
+        try:
+            next(steps)
+        except StopIteration as result:
+            waypoints, _ = result.value
+            break
+    paths = PathBuffer(2)
+    paths.set_segments(1, waypoints)
+    assert paths.tiles(1) == tiles
+
+
+def test_jps_expands_fewer_nodes(make_base_deck, play):
+    expandedPerSearch = {}
+    for pathfinder in (Warzone.PATHFINDER_ASTAR, Warzone.PATHFINDER_JPS):
+        base, deck = make_base_deck(3, 0)
+        env = WarzoneEnv(3, base, deck, is_rendering=False, pathfinder=pathfinder)
+        play(env, 0)
+        assert env.warzone.path_searches > 0
+        expandedPerSearch[pathfinder] = env.warzone.path_expanded_nodes / env.warzone.path_searches
+    assert expandedPerSearch[Warzone.PATHFINDER_JPS] < expandedPerSearch[Warzone.PATHFINDER_ASTAR]
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from coc_env import WarzoneEnv
+from GameObject.deck import Deck
+
+
+SKIP = (0, 0, Deck.DECK_NAME_MAPS_ID["SkipMove"])
+
+
+def play_macro(env, seed: int):
+    """ Deploy every troop on the top row one macro step at a time, recording the action and ticks of each step """
+    env.reset(seed=seed)
+    steps = []
+    total = 0
+    done = False
+    x = 0
+    while not done:
+        deployable = [i for i in range(7) if env.warzone.deckSpace[i, Deck.DECK_MAPPING["count"]] > 0]
+        if deployable:
+            action = (0, x % 45, deployable[0])
+            x += 7
+        else:
+            action = SKIP
+        _, reward, done, _, info = env.step(action)
+        steps.append((action, info["ticks"]))
+        total += reward
+    return steps, total
+
+
+@pytest.mark.parametrize("townHallLevel, seed", [(1, 0), (3, 0)])
+def test_macro_step_replays_per_tick(make_base_deck, townHallLevel, seed):
+    """ A macro step plays out like its deploy followed by skips for the rest of its ticks """
+    base, deck = make_base_deck(townHallLevel, seed)
+    macro = WarzoneEnv(townHallLevel, base, deck, is_rendering=False, macro_step=True)
+    steps, macroTotal = play_macro(macro, seed)
+    assert len(steps) > 1
+    assert all(ticks >= 1 for _, ticks in steps)
+
+    single = WarzoneEnv(townHallLevel, base, deck, is_rendering=False)
+    single.reset(seed=seed)
+    total = 0
+    done = False
+    for action, ticks in steps:
+        for tick in range(ticks):
+            assert not done
+            _, reward, done, _, info = single.step(action if tick == 0 else SKIP)
+            assert info["ticks"] == 1
+            total += reward
+    assert done
+
+    assert total == pytest.approx(macroTotal)
+    assert (single.warzone.stars, single.warzone.destroyed_buildings_count) == (macro.warzone.stars, macro.warzone.destroyed_buildings_count)
+
+
+def test_decision_ticks_bound_a_macro_step(make_base_deck):
+    base, deck = make_base_deck(3, 0)
+    env = WarzoneEnv(3, base, deck, is_rendering=False, macro_step=True, decision_events=(WarzoneEnv.EVENT_TICKS,), decision_ticks=5)
+    steps, _ = play_macro(env, 0)
+    # Every step hands control back after 5 ticks until the deck is empty
+    assert [ticks for _, ticks in steps[:3]] == [5, 5, 5]
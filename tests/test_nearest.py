@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from coc_env import WarzoneEnv
+from GameObject.nearest import NearestBuildingMaps
+
+
+def distance_to(registry, buildingID: int, y: float, x: float) -> float:
+    ys, xs = registry.location(buildingID)
+    return np.sqrt(np.min((ys - y) ** 2 + (xs - x) ** 2))
+
+
+def assert_maps_match_scan(warzone, rng):
+    """ Stored buildings are as near as the scanned one, ambiguous tiles are left to the scan """
+    maps = warzone.nearest_buildings
+    registry = warzone.registry
+    ambiguous = 0
+    for preference in maps.PREFERENCES:
+        if len(maps.members[preference]) == 0:
+            continue
+        ys = rng.uniform(-0.5, 44.5, 300)
+        xs = rng.uniform(-0.5, 44.5, 300)
+        for y, x, buildingID in zip(ys, xs, maps.lookup(preference, ys, xs)):
+            assert buildingID != maps.NONE
+            if buildingID == maps.AMBIGUOUS:
+                ambiguous += 1
+                continue
+            assert registry.hp[buildingID] > 0
+            scanned = warzone.nearest_building_scan(preference, (y, x))
+            assert distance_to(registry, buildingID, y, x) == pytest.approx(distance_to(registry, scanned, y, x))
+    return ambiguous
+
+
+@pytest.mark.parametrize("townHallLevel", [1, 3, 5])
+def test_maps_agree_with_scan(make_base_deck, townHallLevel):
+    base, deck = make_base_deck(townHallLevel, 0)
+    env = WarzoneEnv(townHallLevel, base, deck, is_rendering=False)
+    env.reset(seed=0)
+    rng = np.random.default_rng(townHallLevel)
+
+    assert assert_maps_match_scan(env.warzone, rng) > 0
+
+    # Knock down a third of the buildings, the maps updated in place agree with fresh ones and the scan
+    registry = env.warzone.registry
+    standing = registry.undestroyed_ids()
+    damage = np.zeros(registry.n_ids, dtype=registry.hp.dtype)
+    damage[standing[::3]] = registry.hp[standing[::3]]
+    _, _, destroyed = registry.apply_damage(damage)
+    env.warzone.nearest_buildings.buildings_destroyed(destroyed)
+
+    fresh = NearestBuildingMaps(registry)
+    for preference in fresh.PREFERENCES:
+        np.testing.assert_array_equal(env.warzone.nearest_buildings.maps[preference], fresh.maps[preference])
+    assert_maps_match_scan(env.warzone, rng)
+
+    env.warzone.nearest_buildings.reset()
+    for preference, nearest in env.warzone.nearest_buildings.maps.items():
+        np.testing.assert_array_equal(nearest, env.warzone.nearest_buildings.initial_maps[preference])
@@ -0,0 +1,33 @@
+import numpy as np
+
+from coc_env import WarzoneEnv
+from GameObject.deck import Deck
+
+
+def rollout(env, steps=200):
+    """ Deploy every troop on the top row, one per step, then skip """
+    observation, _ = env.reset(seed=0)
+    rewards = []
+    for t in range(steps):
+        deployable = np.nonzero(env.warzone.deckSpace[:7, Deck.DECK_MAPPING["count"]] > 0)[0]
+        action = (0, t % 45, int(deployable[0])) if len(deployable) else (0, 0, Deck.DECK_NAME_MAPS_ID["SkipMove"])
+        observation, reward, done, _, _ = env.step(action)
+        rewards.append(reward)
+        if done:
+            break
+    return observation, rewards
+
+
+def test_legacy_troop_rows(make_base_deck):
+    base, deck = make_base_deck(1)
+    env = WarzoneEnv(1, base, deck, is_rendering=False)
+    legacy = WarzoneEnv(1, base, deck, is_rendering=False, legacy_troop_rows=True)
+    assert env.observation_space["troops"].shape == (Deck.CAMP_CAPACITY_MAP[1], len(Deck.TROOP_MAPPING))
+    assert legacy.observation_space["troops"].shape == (Deck.LEGACY_TROOP_ROWS, len(Deck.TROOP_MAPPING))
+
+    observation, rewards = rollout(env)
+    legacyObservation, legacyRewards = rollout(legacy)
+    assert rewards == legacyRewards
+    rows = Deck.CAMP_CAPACITY_MAP[1]
+    np.testing.assert_array_equal(legacyObservation["troops"][:rows], observation["troops"])
+    assert np.all(legacyObservation["troops"][rows:] == -1)
@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from coc_env import WarzoneEnv
+from GameObject.warbase import Base
+from GameObject.deck import Deck
+from GameObject.warzone import Warzone
+
+
+def footprint_distance(registry, buildingID, y, x):
+    """ Chebyshev distance from a tile to the footprint of a building """
+    dy = max(registry.y0[buildingID] - y, y - registry.y1[buildingID], 0)
+    dx = max(registry.x0[buildingID] - x, x - registry.x1[buildingID], 0)
+    return max(dy, dx)
+
+
+def test_greedy_wait_follows_path_from_current_tile(make_base_deck, play, monkeypatch):
+    base, deck = make_base_deck(5, seed=1)
+    env = WarzoneEnv(5, base, deck, is_rendering=False, path_budget=100, path_wait=Warzone.PATH_WAIT_GREEDY)
+
+    arrived = []
+    process = Warzone.process_path_jobs
+
+    def process_and_check(warzone):
+        pending = set(warzone.path_jobs)
+        process(warzone)
+        for troopID in pending - set(warzone.path_jobs):
+            if warzone.troops.hp[troopID] <= 0 or not warzone.paths.has_path(troopID):
+                continue
+            y, x = warzone.troop_tile(troopID)
+            wy, wx = warzone.paths.tiles(troopID)[0]
+            targetID = warzone.troops.target_building[troopID]
+            arrived.append((
+                max(abs(wy - y), abs(wx - x)),
+                footprint_distance(warzone.registry, targetID, wy, wx) - footprint_distance(warzone.registry, targetID, y, x)
+            ))
+
+    monkeypatch.setattr(Warzone, "process_path_jobs", process_and_check)
+    play(env, seed=1)
+
+    assert arrived
+    # The first waypoint neighbours the tile the troop is on and does not lead away from the target
+    assert all(step <= 1 and away <= 0 for step, away in arrived)
+    assert env.warzone.stars == 3
+
+
+@pytest.mark.parametrize("pathfinder, budget, ticks", [(Warzone.PATHFINDER_ASTAR, 5, 20), (Warzone.PATHFINDER_JPS, 1, 3)])
+def test_suspended_search_restarts_when_a_wall_falls(pathfinder, budget, ticks):
+    """ A search suspended across a wall falling must not settle on the fallen wall as barrier """
+    base = Base(3)
+    assert base.placeBuilding(base.getBuildingObject("TownHall"), 20, 20)
+    ring = {(y, x) for y in range(18, 26) for x in range(18, 26)} - {(y, x) for y in range(19, 25) for x in range(19, 25)}
+    for y, x in sorted(ring):
+        assert base.placeBuilding(base.getBuildingObject("Wall"), y, x)
+    deck = Deck(3)
+    assert deck.recruitTroop("Barbarian")
+
+    env = WarzoneEnv(3, base, deck, is_rendering=False, path_budget=budget, pathfinder=pathfinder, replan_mode=Warzone.REPLAN_TARGETED)
+    env.reset(seed=0)
+    warzone = env.warzone
+    registry = warzone.registry
+    skip = (0, 0, Deck.DECK_NAME_MAPS_ID["SkipMove"])
+    env.step((10, 22, Deck.DECK_NAME_MAPS_ID["Barbarian"]))
+    for _ in range(ticks):
+        env.step(skip)
+    assert 0 in warzone.path_jobs
+
+    # The wall the search is heading for falls while it is suspended
+    wallID = int(warzone.grid.buildingID[18, 22])
+    damage = np.zeros(registry.n_ids, dtype=np.int64)
+    damage[wallID] = registry.hp[wallID]
+    _, _, destroyed = registry.apply_damage(damage)
+    warzone.buildings_destroyed(destroyed)
+
+    for _ in range(600):
+        env.step(skip)
+    townHallID = warzone.townhall_building_id
+    assert warzone.troops.target_building[0] == townHallID
+    assert registry.hp[townHallID] < registry.max_hp[townHallID]
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from coc_env import WarzoneEnv
+from GameObject.deck import Deck
+
+
+@pytest.mark.parametrize("townHallLevel, seed", [(3, 0), (5, 2)])
+def test_cache_keeps_outcomes(make_base_deck, play, townHallLevel, seed):
+    base, deck = make_base_deck(townHallLevel, seed)
+    default = WarzoneEnv(townHallLevel, base, deck, is_rendering=False)
+    cached = WarzoneEnv(townHallLevel, base, deck, is_rendering=False, path_cache_size=4096)
+
+    assert play(cached, seed) == play(default, seed)
+    assert cached.warzone.path_cache.stats()["hits"] > 0
+
+
+def test_hits_until_passability_changes(make_base_deck):
+    base, deck = make_base_deck(3)
+    env = WarzoneEnv(3, base, deck, is_rendering=False, path_cache_size=16)
+    env.reset()
+    cache = env.warzone.path_cache
+
+    # Troops of one kind deployed on the same tile plan the same path
+    counts = env.warzone.deckSpace[:7, Deck.DECK_MAPPING["count"]]
+    deckID = int(np.argmax(counts))
+    assert counts[deckID] >= 4
+
+    def deploy():
+        env.step((0, 0, deckID))
+        return cache.hits, cache.misses
+
+    assert deploy() == (0, 1)
+    assert deploy() == (1, 1)
+
+    # A new passability version misses, even though nothing changed on the grid
+    env.warzone.registry.bump_passability_version()
+    assert deploy() == (1, 2)
+
+    # Reset goes back to the intact base, whose entries are still valid
+    env.reset()
+    assert deploy() == (2, 2)
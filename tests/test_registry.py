@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from GameObject.registry import BuildingRegistry
+from GameObject.warbase import Base
+
+
+def assert_matches_grid(registry, baseSpace):
+    """ Every registry lookup answers like the Base helper scanning the grid """
+    for buildingID in np.unique(baseSpace[:, :, Base.GRID_MAPPING["buildingID"]]):
+        if buildingID < 0:
+            continue
+        ys, xs = registry.location(buildingID)
+        gridYs, gridXs = Base.get_building_location(baseSpace, buildingID)
+        assert sorted(zip(ys, xs)) == sorted(zip(gridYs, gridXs))
+        for prop in list(BuildingRegistry.STATIC_CHANNELS) + list(BuildingRegistry.DYNAMIC_CHANNELS):
+            assert registry.get_property(buildingID, prop) == Base.get_building_property(baseSpace, buildingID, prop), prop
+
+    np.testing.assert_array_equal(registry.undestroyed_ids(), Base.get_undestroyed_building_ids(baseSpace))
+    for isFlying in (False, True):
+        np.testing.assert_array_equal(registry.passable_mask(isFlying), Base.get_passable_mask(baseSpace, isFlying).astype(bool))
+
+
+@pytest.mark.parametrize("townHallLevel", [1, 3, 5])
+def test_registry_matches_grid(make_base_deck, townHallLevel):
+    base, _ = make_base_deck(townHallLevel)
+    baseSpace = base.getStateSpace()
+    registry = BuildingRegistry(baseSpace)
+    assert_matches_grid(registry, baseSpace)
+
+    # Destroy every other building, walls included, and write the table back
+    damage = np.zeros(registry.n_ids, dtype=registry.hp.dtype)
+    damage[np.nonzero(registry.exists)[0][::2]] = registry.max_hp.max()
+    damage[np.nonzero(registry.exists)[0][1::2]] = 1
+    registry.apply_damage(damage)
+    registry.write_grid(baseSpace)
+    assert_matches_grid(registry, baseSpace)
+
+    registry.reset()
+    registry.write_grid(baseSpace)
+    np.testing.assert_array_equal(baseSpace, base.getStateSpace())
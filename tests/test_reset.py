@@ -0,0 +1,34 @@
+import numpy as np
+
+from coc_env import WarzoneEnv
+
+
+def test_reset_restores_template(make_base_deck, play):
+    base, deck = make_base_deck(2)
+    env = WarzoneEnv(2, base, deck, is_rendering=False)
+    fresh = WarzoneEnv(2, base, deck, is_rendering=False)
+
+    first = play(env, seed=3)
+    observation, _ = env.reset()
+    freshObservation, _ = fresh.reset()
+    for key in freshObservation:
+        np.testing.assert_array_equal(observation[key], freshObservation[key])
+
+    template = env.template
+    np.testing.assert_array_equal(env.warzone.baseSpace, template["base"])
+    np.testing.assert_array_equal(env.warzone.troopSpace, template["troops"])
+    np.testing.assert_array_equal(env.warzone.deckSpace, template["deck"])
+
+    # A restored episode plays out exactly like the first one and like one on a fresh env
+    assert play(env, seed=3) == first
+    assert play(fresh, seed=3) == first
+
+
+def test_edited_base_rebuilds_template(make_base_deck):
+    base, deck = make_base_deck(2)
+    env = WarzoneEnv(2, base, deck, is_rendering=False)
+    env.reset()
+
+    base.removeBuilding(next(iter(base.placedBuildings)))
+    observation, _ = env.reset()
+    np.testing.assert_array_equal(observation["base"], base.getStateSpace())
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from coc_env import WarzoneEnv, ReassembledObservation
+from GameObject.deck import Deck
+
+
+def actions(steps: int = 150):
+    """ Deploy on the top row every third step, skip otherwise """
+    for t in range(steps):
+        yield (0, t % 45, 0) if t % 3 == 0 else (0, 0, Deck.DECK_NAME_MAPS_ID["SkipMove"])
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_split_observation(make_base_deck, compact):
+    base, deck = make_base_deck(3, 0)
+    split = WarzoneEnv(3, base, deck, is_rendering=False, split_obs=True, compact_obs=compact)
+    observation, info = split.reset(seed=0)
+
+    assert split.static_observation_space.contains(info["static"])
+    assert split.observation_space.contains(observation)
+    assert not set(info["static"]) & set(observation)
+    assert not any(key.startswith("base_static") for key in observation)
+
+    # Only the dynamic part is sent every step
+    whole = WarzoneEnv(3, base, deck, is_rendering=False, compact_obs=compact)
+    wholeObservation, _ = whole.reset(seed=0)
+    stepBytes = sum(array.nbytes for array in observation.values())
+    assert 1.5 * stepBytes < sum(array.nbytes for array in wholeObservation.values())
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_reassembled_equals_whole(make_base_deck, compact):
+    base, deck = make_base_deck(3, 0)
+    whole = WarzoneEnv(3, base, deck, is_rendering=False, compact_obs=compact)
+    reassembled = ReassembledObservation(WarzoneEnv(3, base, deck, is_rendering=False, split_obs=True, compact_obs=compact))
+
+    wholeObservation, _ = whole.reset(seed=0)
+    observation, _ = reassembled.reset(seed=0)
+    for action in actions():
+        assert observation.keys() == wholeObservation.keys()
+        assert reassembled.observation_space.contains(observation)
+        for key in observation:
+            np.testing.assert_array_equal(observation[key], wholeObservation[key])
+
+        wholeObservation, _, wholeDone, _, _ = whole.step(action)
+        observation, _, done, _, _ = reassembled.step(action)
+        assert done == wholeDone
+        if done:
+            break
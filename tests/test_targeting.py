@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from coc_env import WarzoneEnv
+from GameObject.deck import Deck
+from GameObject.warzone import Warzone
+
+
+def assert_index_consistent(warzone):
+    """ Every current target is recorded in the index, stale entries are allowed """
+    index = warzone.targets
+    targets = warzone.troopSpace[:, Deck.TROOP_MAPPING["target_building"]]
+    for troopID in np.nonzero(targets != -1)[0]:
+        assert troopID in index.attackers[int(targets[troopID])]
+    defenseIDs = warzone.registry.def_ids
+    lockedOn = warzone.registry.target_troop[defenseIDs]
+    for defenseID, troopID in zip(defenseIDs[lockedOn != -1], lockedOn[lockedOn != -1]):
+        assert defenseID in index.defenders[int(troopID)]
+
+
+@pytest.mark.parametrize("replanMode", [Warzone.REPLAN_FULL, Warzone.REPLAN_TARGETED])
+def test_index_follows_episode(make_base_deck, replanMode):
+    base, deck = make_base_deck(3, 0)
+    env = WarzoneEnv(3, base, deck, is_rendering=False, replan_mode=replanMode)
+    env.reset(seed=0)
+    rng = np.random.default_rng(0)
+    done = False
+    while not done:
+        deployable = [i for i in range(7) if env.warzone.deckSpace[i, Deck.DECK_MAPPING["count"]] > 0]
+        if deployable and rng.random() < 0.3:
+            action = (0, int(rng.integers(0, 45)), deployable[0])
+        else:
+            action = (0, 0, Deck.DECK_NAME_MAPS_ID["SkipMove"])
+        _, _, done, _, _ = env.step(action)
+        assert_index_consistent(env.warzone)
+    assert env.warzone.destroyed_buildings_count > 0
+
+
+def test_release_matches_scan(make_base_deck):
+    base, deck = make_base_deck(3, 0)
+    env = WarzoneEnv(3, base, deck, is_rendering=False)
+    env.reset(seed=0)
+    index = env.warzone.targets
+    targets = env.warzone.troopSpace[:, Deck.TROOP_MAPPING["target_building"]]
+
+    buildingIDs = env.warzone.registry.undestroyed_ids()[:3]
+    troopIDs = np.arange(9)
+    index.assign(troopIDs, np.repeat(buildingIDs, 3))
+    # Retargeting elsewhere leaves a stale entry that must not be released
+    index.assign(np.array([0]), buildingIDs[1:2])
+
+    released = index.release_buildings(buildingIDs[:2])
+    np.testing.assert_array_equal(released, [0, 1, 2, 3, 4, 5])
+    assert np.all(targets[released] == -1)
+    np.testing.assert_array_equal(targets[6:9], [buildingIDs[2]] * 3)
+
+    lockedOn = env.warzone.registry.target_troop
+    defenseIDs = env.warzone.registry.def_ids[:2]
+    lockedOn[defenseIDs] = 7
+    index.lock(defenseIDs, np.array([7, 7]), np.array([-1, -1]))
+    lockedOn[defenseIDs[1]] = 8
+    index.lock(defenseIDs[1:], np.array([8]), np.array([7]))
+    assert index.release_troops(np.array([7])) == [defenseIDs[0]]
+    assert index.release_troops(np.array([8])) == [defenseIDs[1]]
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from coc_env import WarzoneEnv
+from GameObject.warbase import Base
+from GameObject.deck import Deck
+
+
+# Single troop battles played by the per-troop loop the tick engine replaced:
+# (town hall, seed) -> reward, destruction percentage, stars, buildings destroyed, troops lost
+BASELINE_SINGLE_TROOP = {
+    (1, 0): (110691.22, 9.479, 0, 1, 0),
+    (1, 1): (117432.22, 15.403, 0, 2, 0),
+    (1, 2): (-9823.12, 10.664, 1, 1, 0),
+    (3, 0): (4769.37, 3.544, 0, 1, 1),
+    (3, 1): (1119.3, 3.544, 0, 1, 0),
+}
+
+# Rewards of the tick engine under the `play` policy, one episode
+TICK_ENGINE_REWARDS = {
+    (1, 0): 63384.06,
+    (3, 0): 247332.74,
+}
+
+
+@pytest.mark.parametrize("townHallLevel, seed", list(BASELINE_SINGLE_TROOP))
+def test_single_troop_matches_baseline(make_base_deck, townHallLevel, seed):
+    """
+    The old loop moved at most one troop per tick, so only a single troop battle plays out the same.
+    Its outcome is identical, the reward only differs by the tick a kill is credited on
+    """
+    base, deck = make_base_deck(townHallLevel, seed)
+    env = WarzoneEnv(townHallLevel, base, deck, is_rendering=False)
+    env.reset(seed=seed)
+
+    deckID = int(np.nonzero(env.warzone.deckSpace[:7, Deck.DECK_MAPPING["count"]] > 0)[0][0])
+    y, x = np.argwhere(env.warzone.baseSpace[:, :, Base.GRID_MAPPING["building_type"]] == 0)[0]
+    action = (int(y), int(x), deckID)
+    total = 0
+    done = False
+    while not done:
+        _, reward, done, _, _ = env.step(action)
+        total += reward
+        action = (0, 0, Deck.DECK_NAME_MAPS_ID["SkipMove"])
+
+    reward, destruction, stars, destroyed, lost = BASELINE_SINGLE_TROOP[townHallLevel, seed]
+    wz = env.warzone
+    assert (round(wz.destruction_percentage, 3), wz.stars, wz.destroyed_buildings_count, wz.troops_lost) == (destruction, stars, destroyed, lost)
+    assert total == pytest.approx(reward, rel=0.02)
+
+
+@pytest.mark.parametrize("townHallLevel, seed", list(TICK_ENGINE_REWARDS))
+def test_rewards_for_fixed_seeds(make_base_deck, play, townHallLevel, seed):
+    base, deck = make_base_deck(townHallLevel, seed)
+    env = WarzoneEnv(townHallLevel, base, deck, is_rendering=False)
+    assert round(play(env, seed), 2) == TICK_ENGINE_REWARDS[townHallLevel, seed]
+
+
+def test_battle_ends_once_the_deck_is_spent_and_troops_are_dead(make_base_deck):
+    base, deck = make_base_deck(3, 0)
+    env = WarzoneEnv(3, base, deck, is_rendering=False)
+    env.reset(seed=0)
+    warzone = env.warzone
+    t = 0
+    while len(Deck.get_deck_available_deploy_options(warzone.deckSpace)):
+        deployable = np.nonzero(warzone.deckSpace[:7, Deck.DECK_MAPPING["count"]] > 0)[0]
+        env.step((0, t * 7 % 45, int(deployable[0])))
+        t += 1
+    alive = warzone.slots.alive_ids()
+    assert len(alive) and not warzone.did_end()
+
+    warzone.troops.hp[alive] = 0
+    warzone.slots.died(alive)
+    assert warzone.did_end()
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from coc_env import WarzoneEnv, ReassembledObservation
+from GameObject.deck import Deck
+from GameObject.troop_raster import TroopRaster
+from GameObject.config import BASE_WIDTH, SCALE_FACTOR
+
+
+def recount(troopSpace: np.ndarray) -> np.ndarray:
+    """ Raster of the troops alive, one troop at a time """
+    raster = np.zeros((BASE_WIDTH, BASE_WIDTH, len(TroopRaster.MAPPING)), dtype=int)
+    for troopID in Deck.get_troops_alive_ids(troopSpace):
+        y, x = Deck.get_troop_pos(troopSpace, troopID, unscaled=True)
+        y = min(max(int(np.round(y)), 0), BASE_WIDTH - 1)
+        x = min(max(int(np.round(x)), 0), BASE_WIDTH - 1)
+        flying = bool(Deck.get_troop_is_flying(troopSpace, troopID))
+        raster[y, x, TroopRaster.MAPPING["air_count" if flying else "ground_count"]] += 1
+        raster[y, x, TroopRaster.MAPPING["air_hp" if flying else "ground_hp"]] += troopSpace[troopID, Deck.TROOP_MAPPING["hp"]]
+    return raster
+
+
+@pytest.mark.parametrize("options", [{}, {"split_obs": True, "compact_obs": True}])
+def test_raster_matches_recount(make_base_deck, options):
+    base, deck = make_base_deck(5, 0)
+    env = WarzoneEnv(5, base, deck, is_rendering=False, troop_raster=True, **options)
+    observation, _ = env.reset(seed=0)
+    key = "troop_density" if not options else "troop_density_int16"
+    assert not observation[key].any()
+
+    counted = 0
+    for t in range(200):
+        deployable = np.nonzero(env.warzone.deckSpace[:7, Deck.DECK_MAPPING["count"]] > 0)[0]
+        action = (0, t * 7 % 45, int(deployable[0])) if len(deployable) and t % 2 == 0 else (0, 0, Deck.DECK_NAME_MAPS_ID["SkipMove"])
+        observation, _, done, _, _ = env.step(action)
+        raster = recount(env.warzone.troopSpace)
+        if options:
+            # Compact counts and HP are separate arrays of their own dtype
+            counts = [TroopRaster.MAPPING["ground_count"], TroopRaster.MAPPING["air_count"]]
+            np.testing.assert_array_equal(observation["troop_density_int16"], raster[..., counts])
+        else:
+            np.testing.assert_array_equal(observation["troop_density"], raster)
+        counted = max(counted, raster[..., TroopRaster.MAPPING["ground_count"]].sum())
+        if done:
+            break
+    assert counted > 1
+
+
+def test_reassembled_raster(make_base_deck):
+    base, deck = make_base_deck(3, 0)
+    env = ReassembledObservation(WarzoneEnv(3, base, deck, is_rendering=False, troop_raster=True, split_obs=True))
+    env.reset(seed=0)
+    for t in range(20):
+        observation, _, _, _, _ = env.step((0, t * 7 % 45, 0) if t < 5 else (0, 0, Deck.DECK_NAME_MAPS_ID["SkipMove"]))
+    np.testing.assert_array_equal(observation["troop_density"], recount(env.unwrapped.warzone.troopSpace))
@@ -43,7 +43,9 @@ class AttackScreen:
             self.townHallLevel,
             self.base,
             self.deck,
-            is_rendering=False
+            is_rendering=False,
+            # The bundled model was trained on the 135-row troop observation
+            legacy_troop_rows=True
         )
 
         self.obs, _ = self.warzone_env.reset()
@@ -554,7 +556,7 @@ class AttackScreen:
     def handleClickReset(self):
         self.setAttackModes(False)
         self.setMode(True)
-        self.warzone_env = WarzoneEnv(self.townHallLevel, self.base, self.deck, is_rendering=False)
+        self.warzone_env = WarzoneEnv(self.townHallLevel, self.base, self.deck, is_rendering=False, legacy_troop_rows=True)
         self.updateStatusWidgets()
         self.training_in_progress = False
         self.model = None